@@ -18,6 +18,7 @@ import io
 import html
 import logging
 import gc
+from collections import OrderedDict
 from datetime import datetime
 
 # ✅ Agregar el directorio src al path (ANTES de importar módulos internos)
@@ -53,6 +54,56 @@ gc.collect()
 # Constantes de límites
 MAX_FILE_SIZE_MB = 100
 MAX_ROWS_WARNING = 100000
+MAX_ANALISIS_RIESGO_SESION = 32  # Análisis de riesgo memorizados por sesión
+
+# Archivo local para modo desarrollo
+RUTA_EXCEL_LOCAL = Path(__file__).parent / "data" / "Data_Clients&TX.xlsx"
+
+# Columnas visibles en la tabla de últimas transacciones (evita serializar las legacy)
+COLUMNAS_TABLA_TX = [
+    "fecha", "hora", "tx_id", "tipo_tx", "beneficiario",
+    "banco", "monto_cop", "comision_cop", "estado",
+]
+
+# Colores y emojis de la sección de riesgo
+_COLORES_NIVEL = {"Bajo": "#4CAF50", "Medio": "#FF9800", "Alto": "#f44336", "Crítico": "#9C27B0", "No Evaluado": "#757575"}
+_EMOJIS_NIVEL = {"Bajo": "✅", "Medio": "⚠️", "Alto": "🚨", "Crítico": "🔥", "No Evaluado": "❓"}
+_COLOR_PRIORIDAD = {"Crítica": "#9C27B0", "Alta": "#f44336", "Media": "#FF9800", "Baja": "#2196F3"}
+_EMOJI_TIPO = {"UIAF": "📋", "Fraude": "🚨", "Operacional": "⚙️", "Compliance": "📜", "Reputacional": "👁️"}
+
+# Plantillas HTML de la sección de riesgo (se interpolan con str.format en cada render)
+_TPL_NIVEL_RIESGO = """
+<div style='background: {color};
+            padding: 20px;
+            border-radius: 10px;
+            text-align: center;
+            margin: 20px 0;
+            box-shadow: 0 4px 12px rgba(0,0,0,0.15);'>
+    <h2 style='margin: 0; color: white; font-size: 28px;'>{emoji} Nivel de Riesgo: {nivel}</h2>
+</div>
+""".format
+
+_TPL_ALERTA = """
+<div style='background: {color}15;
+            border-left: 5px solid {color};
+            padding: 15px;
+            margin: 10px 0;
+            border-radius: 8px;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.1);'>
+    <h4 style='margin: 0 0 8px 0; color: {color};'>
+        {emoji_tipo} {titulo}
+    </h4>
+    <p style='margin: 5px 0; color: #555;'><strong>Tipo:</strong> {tipo} | <strong>Prioridad:</strong> {prioridad}</p>
+    <p style='margin: 5px 0; color: #666;'>{descripcion}</p>
+    <p style='margin: 8px 0 5px 0; background: #f5f5f5; padding: 8px; border-radius: 5px;'>
+        <strong>💡 Acción requerida:</strong> {accion}
+    </p>
+    <p style='margin: 5px 0 0 0; color: #888; font-size: 12px;'>
+        ⏰ Días para acción: {dias} |
+        {reporte_uiaf}
+    </p>
+</div>
+""".format
 
 
 # =========================
@@ -94,6 +145,65 @@ def _safe(s: str) -> str:
     return html.escape(str(s))
 
 
+def _histograma_codigos(serie: pd.Series, pesos: pd.Series = None):
+    """
+    Histograma por valor usando códigos enteros + np.bincount (una sola pasada).
+    pd.factorize reutiliza los códigos si la serie ya es category.
+
+    Returns:
+        (valores, conteos, sumas de pesos o None) ordenados por conteo descendente
+    """
+    codigos, valores = pd.factorize(serie, use_na_sentinel=False)
+    conteos = np.bincount(codigos, minlength=len(valores))
+    sumas = None
+    if pesos is not None:
+        sumas = np.bincount(codigos, weights=pesos.to_numpy(dtype=float), minlength=len(valores))
+    orden = np.argsort(-conteos, kind="stable")
+    return np.asarray(valores)[orden], conteos[orden], (sumas[orden] if sumas is not None else None)
+
+
+def _barras_riesgo_html(valores: dict, color: str = "#2196F3") -> str:
+    """Construye las barras de progreso de la matriz de riesgo como un único bloque HTML."""
+    barras = []
+    for categoria, valor in (valores or {}).items():
+        try:
+            v = float(valor)
+        except Exception:
+            v = 0.0
+        v = min(max(v, 0), 100)
+        barras.append(
+            f"<div style='margin: 6px 0;'>"
+            f"<span style='font-size: 14px;'>{_safe(str(categoria).capitalize())}: {v:.0f}/100</span>"
+            f"<div style='background: #eee; border-radius: 4px;'>"
+            f"<div style='width: {v:.0f}%; background: {color}; height: 8px; border-radius: 4px;'></div>"
+            f"</div></div>"
+        )
+    return "".join(barras)
+
+
+def _html_alertas_prioritarias(alertas: list) -> str:
+    """Construye las tarjetas de alertas prioritarias como un único bloque HTML."""
+    tarjetas = []
+    for alerta in alertas:
+        prioridad = alerta.get("prioridad", "Media")
+        tipo = alerta.get("tipo", "Compliance")
+
+        tarjetas.append(
+            _TPL_ALERTA(
+                color=_COLOR_PRIORIDAD.get(prioridad, "#757575"),
+                emoji_tipo=_EMOJI_TIPO.get(tipo, "⚠️"),
+                titulo=_safe(alerta.get('titulo', 'Alerta')),
+                tipo=_safe(tipo),
+                prioridad=_safe(prioridad),
+                descripcion=_safe(alerta.get('descripcion', '')),
+                accion=_safe(alerta.get('accion_requerida', '')),
+                dias=_safe(alerta.get('dias_para_accion', '')),
+                reporte_uiaf='📋 Requiere reporte UIAF' if alerta.get('requiere_reporte_uiaf', False) else '✅ No requiere reporte',
+            )
+        )
+    return "".join(tarjetas)
+
+
 def normalizar_nombre_entidad(nombre: str) -> str:
     """
     Normaliza nombres de beneficiarios y bancos para evitar duplicados por variaciones sintácticas.
@@ -457,7 +567,7 @@ def cargar_datos_clientes(archivo_subido=None, usar_datos_ejemplo=False):
             return None, None, None
     else:
         # Modo desarrollo: intentar cargar desde ruta local
-        ruta_excel = Path(__file__).parent / "data" / "Data_Clients&TX.xlsx"
+        ruta_excel = RUTA_EXCEL_LOCAL
         
         if not ruta_excel.exists():
             logger.warning(f"Archivo Excel local no encontrado: {ruta_excel}")
@@ -781,6 +891,37 @@ def mostrar_tabla_paginada(df: pd.DataFrame, titulo: str = "Transacciones", fila
         st.caption(f"📊 Mostrando {inicio + 1} - {fin} de {total_filas:,} registros | Página {pagina} de {total_paginas}")
 
 
+def obtener_analisis_riesgo(df_cliente: pd.DataFrame, cliente: str, clave: tuple) -> dict:
+    """
+    Retorna el análisis de riesgo del cliente memorizado en session_state.
+
+    Se usa un LRU acotado en la sesión en lugar de st.cache_data para evitar
+    el hash del DataFrame y la copia profunda del dict en cada rerun.
+
+    Args:
+        df_cliente: DataFrame del cliente (ya filtrado por período)
+        cliente: Nombre del cliente
+        clave: Identifica datos + período, p. ej. (cliente, inicio, fin, data_version)
+    """
+    cache = st.session_state.setdefault("cache_analisis_riesgo", OrderedDict())
+
+    analisis = cache.get(clave)
+    if analisis is not None:
+        cache.move_to_end(clave)
+        return analisis
+
+    logger.info(f"Iniciando análisis de riesgo para cliente: {cliente}")
+    perfil_gafi = caracterizar_cliente_gafi(df_cliente)
+    analisis = analizar_riesgo_cliente(df_cliente, perfil_gafi, cliente)
+    logger.info(f"✓ Análisis de riesgo completado para {cliente} - Nivel: {analisis.get('scoring', {}).get('nivel_riesgo', 'N/A')}")
+
+    cache[clave] = analisis
+    while len(cache) > MAX_ANALISIS_RIESGO_SESION:
+        clave_vieja, _ = cache.popitem(last=False)
+        st.session_state.get("cache_html_alertas", {}).pop(clave_vieja, None)
+    return analisis
+
+
 @st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=10)
 def resumen_por_cliente(df_completo: pd.DataFrame, lista_clientes: list[str]) -> dict:
     """Pre-calcula resúmenes por cliente para no recalcular en cada render."""
@@ -806,12 +947,13 @@ def resumen_por_cliente(df_completo: pd.DataFrame, lista_clientes: list[str]) ->
             # Filtrar fechas razonables (desde año 2000 en adelante)
             fecha_minima = pd.Timestamp('2000-01-01')
             fechas_validas = fechas_validas[fechas_validas >= fecha_minima]
-            primera = fechas_validas.min() if len(fechas_validas) > 0 else pd.NaT
-            ultima = fechas_validas.max() if len(fechas_validas) > 0 else pd.NaT
+            # Fechas ordenadas: permiten resolver el rango filtrado con searchsorted
+            fechas_ordenadas = np.sort(fechas_validas.to_numpy())
         else:
-            primera = pd.NaT
-            ultima = pd.NaT
-        
+            fechas_ordenadas = np.array([], dtype="datetime64[ns]")
+
+        primera = pd.Timestamp(fechas_ordenadas[0]) if len(fechas_ordenadas) > 0 else pd.NaT
+        ultima = pd.Timestamp(fechas_ordenadas[-1]) if len(fechas_ordenadas) > 0 else pd.NaT
         dias_activo = int((ultima - primera).days) if pd.notna(primera) and pd.notna(ultima) else 0
 
         tasa_exito = (eff_tx / total_tx * 100) if total_tx > 0 else 0.0
@@ -827,6 +969,7 @@ def resumen_por_cliente(df_completo: pd.DataFrame, lista_clientes: list[str]) ->
             "primera": primera,
             "ultima": ultima,
             "dias_activo": dias_activo,
+            "fechas_ordenadas": fechas_ordenadas,
         }
     
     logger.info(f"✓ Resúmenes calculados para {len(out)} clientes")
@@ -1095,6 +1238,7 @@ st.markdown("## 📂 Cargar Datos Transaccionales")
 df_completo = None
 clientes_info = None
 lista_clientes = None
+data_version = None  # Identifica el dataset cargado (para caches de sesión)
 
 # Modo 1: Subir Archivo
 if metodo_carga == "📤 Subir Archivo":
@@ -1124,6 +1268,7 @@ if metodo_carga == "📤 Subir Archivo":
         try:
             with st.spinner("📊 Cargando y procesando datos..."):
                 df_completo, clientes_info, lista_clientes = cargar_datos_clientes(archivo_subido=archivo_subido)
+            data_version = ("subido", getattr(archivo_subido, "file_id", archivo_subido.name), archivo_subido.size)
             
             if df_completo is not None and not df_completo.empty:
                 # Warning si hay muchas filas
@@ -1160,6 +1305,7 @@ elif metodo_carga == "🎯 Datos de Ejemplo (Demo)":
         try:
             with st.spinner("📊 Generando datos de ejemplo..."):
                 df_completo, clientes_info, lista_clientes = cargar_datos_clientes(usar_datos_ejemplo=True)
+            data_version = ("demo",)
             
             if df_completo is not None and not df_completo.empty:
                 st.success(f"✅ Datos de ejemplo cargados: {len(lista_clientes)} clientes, {len(df_completo):,} transacciones")
@@ -1182,6 +1328,7 @@ elif metodo_carga == "📁 Archivo Local":
     try:
         with st.spinner("📊 Cargando datos desde archivo local..."):
             df_completo, clientes_info, lista_clientes = cargar_datos_clientes(archivo_subido=None)
+        data_version = ("local", RUTA_EXCEL_LOCAL.stat().st_mtime if RUTA_EXCEL_LOCAL.exists() else None)
         
         if df_completo is not None and not df_completo.empty:
             st.success(f"✅ Datos locales cargados: {len(lista_clientes)} clientes, {len(df_completo):,} transacciones")
@@ -1209,6 +1356,7 @@ if df_completo is None or df_completo.empty:
     )
     st.stop()
 
+st.session_state["data_version"] = data_version
 resumen = resumen_por_cliente(df_completo, lista_clientes)
 
 st.markdown("---")
@@ -1965,8 +2113,8 @@ for i in range(0, len(lista_clientes), num_cols_tarjetas):
                 tipos_dict = {}
                 dfc = r["df"]
                 if "tipo_tx_norm" in dfc.columns:
-                    for tipo, count in dfc["tipo_tx_norm"].value_counts(dropna=False).items():
-                        t = tipo or "DESCONOCIDO"
+                    valores_tipo, conteos_tipo, _ = _histograma_codigos(dfc["tipo_tx_norm"].fillna("DESCONOCIDO"))
+                    for t, count in zip(valores_tipo, conteos_tipo):
                         if "FONDO" in t or "FONDEO" in t:
                             tipos_dict["Fondeo"] = tipos_dict.get("Fondeo", 0) + int(count)
                         elif "CREDITO" in t or "CRÉDITO" in t:
@@ -1984,13 +2132,15 @@ for i in range(0, len(lista_clientes), num_cols_tarjetas):
                 # Estados (sobre todo el cliente)
                 metricas_estado = {}
                 if "estado_norm" in dfc.columns:
-                    vc = dfc["estado_norm"].value_counts(dropna=False)
-                    for estado, cnt in vc.items():
-                        est = estado or "DESCONOCIDO"
-                        df_est = dfc[dfc["estado_norm"].fillna("DESCONOCIDO") == est]
+                    # Conteo y monto por estado en una sola pasada (sin re-filtrar por estado)
+                    valores_est, conteos_est, montos_est = _histograma_codigos(
+                        dfc["estado_norm"].fillna("DESCONOCIDO"),
+                        pesos=dfc["monto_cop"] if "monto_cop" in dfc.columns else None,
+                    )
+                    for i_est, est in enumerate(valores_est):
                         metricas_estado[est] = {
-                            "tx": int(cnt),
-                            "monto": float(df_est["monto_cop"].sum()) if "monto_cop" in df_est.columns else 0.0,
+                            "tx": int(conteos_est[i_est]),
+                            "monto": float(montos_est[i_est]) if montos_est is not None else 0.0,
                         }
 
                 # Header (escape cliente) - Tamaño desde configuración
@@ -2186,13 +2336,13 @@ for idx, cliente in enumerate(lista_clientes):
         monto_promedio_cliente = float(df_cliente_efectivo["monto_cop"].mean()) if "monto_cop" in df_cliente_efectivo.columns and len(df_cliente_efectivo) > 0 else 0.0
         tasa_exito_cliente = (tx_efectivas_cliente / total_tx_cliente * 100) if total_tx_cliente > 0 else 0.0
         
-        # Fechas del período filtrado
-        if "fecha" in df_cliente.columns and len(df_cliente) > 0:
-            fechas_validas = df_cliente["fecha"].dropna()
-            fecha_minima = pd.Timestamp('2000-01-01')
-            fechas_validas = fechas_validas[fechas_validas >= fecha_minima]
-            primera_tx = fechas_validas.min() if len(fechas_validas) > 0 else pd.NaT
-            ultima_tx = fechas_validas.max() if len(fechas_validas) > 0 else pd.NaT
+        # Fechas del período filtrado (búsqueda binaria sobre las fechas cacheadas)
+        fechas_ordenadas = r["fechas_ordenadas"]
+        i_ini = np.searchsorted(fechas_ordenadas, fecha_inicio_ts.to_datetime64(), side="left")
+        i_fin = np.searchsorted(fechas_ordenadas, fecha_fin_ts.to_datetime64(), side="right")
+        if i_fin > i_ini:
+            primera_tx = pd.Timestamp(fechas_ordenadas[i_ini])
+            ultima_tx = pd.Timestamp(fechas_ordenadas[i_fin - 1])
         else:
             primera_tx = pd.NaT
             ultima_tx = pd.NaT
@@ -3116,17 +3266,20 @@ for idx, cliente in enumerate(lista_clientes):
         # 4. TIPOS DE TRANSACCIONES
         # ============================================
         if "tipo_tx_norm" in df_cliente_efectivo.columns and len(df_cliente_efectivo) > 0:
-            tipos_tx = df_cliente_efectivo["tipo_tx_norm"].fillna("DESCONOCIDO").value_counts()
+            valores_tipo, conteos_tipo, _ = _histograma_codigos(df_cliente_efectivo["tipo_tx_norm"].fillna("DESCONOCIDO"))
             st.markdown("**📋 Tipos de Transacciones (Efectivas):**")
-            for tipo, cantidad in tipos_tx.items():
+            for tipo, cantidad in zip(valores_tipo, conteos_tipo):
                 pct_tipo = (cantidad / tx_efectivas_cliente * 100) if tx_efectivas_cliente > 0 else 0
                 st.write(f"• {tipo}: {int(cantidad):,} ({pct_tipo:.1f}%)")
 
         # Tabla transacciones recientes con paginación
         st.markdown("---")
         st.markdown("#### 📋 Últimas Transacciones")
+        # Solo las columnas visibles: st.dataframe serializa todas las columnas a Arrow
+        cols_tabla = [c for c in COLUMNAS_TABLA_TX if c in df_cliente.columns]
+        df_cliente_display = df_cliente[cols_tabla].head(200).reset_index(drop=True)
         mostrar_tabla_paginada(
-            df_cliente.head(200),  # Mostrar hasta 200 con paginación
+            df_cliente_display,  # Mostrar hasta 200 con paginación
             titulo="Transacciones del Cliente",
             filas_por_pagina=50,
             key_prefix=f"tx_{cliente.replace(' ', '_')}"
@@ -3267,11 +3420,9 @@ for idx, cliente in enumerate(lista_clientes):
         st.markdown("<p style='color: gray; margin-top: -10px;'>Sistema completo de evaluación multicapa (GAFI + UIAF + Operativo)</p>", unsafe_allow_html=True)
 
         # Para compatibilidad: pasamos df_cliente con columnas legacy presentes
-        logger.info(f"Iniciando análisis de riesgo para cliente: {cliente}")
         try:
-            perfil_gafi = caracterizar_cliente_gafi(df_cliente)
-            analisis_riesgo = analizar_riesgo_cliente(df_cliente, perfil_gafi, cliente)
-            logger.info(f"✓ Análisis de riesgo completado para {cliente} - Nivel: {analisis_riesgo.get('scoring', {}).get('nivel_riesgo', 'N/A')}")
+            clave_riesgo = ("riesgo", cliente, fecha_inicio_ts, fecha_fin_ts, st.session_state["data_version"])
+            analisis_riesgo = obtener_analisis_riesgo(df_cliente, cliente, clave_riesgo)
         except Exception as e:
             logger.error(f"Error en análisis de riesgo para {cliente}: {str(e)}")
             st.error(f"⚠️ Error analizando riesgo: {str(e)}")
@@ -3292,20 +3443,13 @@ for idx, cliente in enumerate(lista_clientes):
             st.metric("Score Operativo", f"{scoring.get('score_operativo','N/A')}/100", delta="25% peso")
 
         nivel = scoring.get("nivel_riesgo", "No Evaluado")
-        colores_nivel = {"Bajo": "#4CAF50", "Medio": "#FF9800", "Alto": "#f44336", "Crítico": "#9C27B0", "No Evaluado": "#757575"}
-        emojis_nivel = {"Bajo": "✅", "Medio": "⚠️", "Alto": "🚨", "Crítico": "🔥", "No Evaluado": "❓"}
 
         st.markdown(
-            f"""
-            <div style='background: {colores_nivel.get(nivel, "#757575")};
-                        padding: 20px;
-                        border-radius: 10px;
-                        text-align: center;
-                        margin: 20px 0;
-                        box-shadow: 0 4px 12px rgba(0,0,0,0.15);'>
-                <h2 style='margin: 0; color: white; font-size: 28px;'>{emojis_nivel.get(nivel, "❓")} Nivel de Riesgo: {_safe(nivel)}</h2>
-            </div>
-            """,
+            _TPL_NIVEL_RIESGO(
+                color=_COLORES_NIVEL.get(nivel, "#757575"),
+                emoji=_EMOJIS_NIVEL.get(nivel, "❓"),
+                nivel=_safe(nivel),
+            ),
             unsafe_allow_html=True,
         )
 
@@ -3321,10 +3465,13 @@ for idx, cliente in enumerate(lista_clientes):
         alertas = analisis_riesgo.get("alertas", [])
 
         if alertas:
-            crit = [a for a in alertas if a.get("prioridad") == "Crítica"]
-            altas = [a for a in alertas if a.get("prioridad") == "Alta"]
-            medias = [a for a in alertas if a.get("prioridad") == "Media"]
-            bajas = [a for a in alertas if a.get("prioridad") == "Baja"]
+            # Clasificar por prioridad en una sola pasada
+            buckets = {"Crítica": [], "Alta": [], "Media": [], "Baja": []}
+            for a in alertas:
+                bucket = buckets.get(a.get("prioridad"))
+                if bucket is not None:
+                    bucket.append(a)
+            crit, altas, medias, bajas = (buckets[k] for k in ("Crítica", "Alta", "Media", "Baja"))
 
             a1, a2, a3, a4 = st.columns(4)
             with a1:
@@ -3339,44 +3486,25 @@ for idx, cliente in enumerate(lista_clientes):
             st.markdown("#### Alertas Prioritarias")
             importantes = crit + altas
             if importantes:
-                for alerta in importantes:
-                    prioridad = alerta.get("prioridad", "Media")
-                    color = {"Crítica": "#9C27B0", "Alta": "#f44336", "Media": "#FF9800", "Baja": "#2196F3"}.get(prioridad, "#757575")
-                    tipo = alerta.get("tipo", "Compliance")
-                    emoji_tipo = {"UIAF": "📋", "Fraude": "🚨", "Operacional": "⚙️", "Compliance": "📜", "Reputacional": "👁️"}.get(tipo, "⚠️")
-
-                    st.markdown(
-                        f"""
-                        <div style='background: {color}15;
-                                    border-left: 5px solid {color};
-                                    padding: 15px;
-                                    margin: 10px 0;
-                                    border-radius: 8px;
-                                    box-shadow: 0 2px 8px rgba(0,0,0,0.1);'>
-                            <h4 style='margin: 0 0 8px 0; color: {color};'>
-                                {emoji_tipo} {_safe(alerta.get('titulo','Alerta'))}
-                            </h4>
-                            <p style='margin: 5px 0; color: #555;'><strong>Tipo:</strong> {_safe(tipo)} | <strong>Prioridad:</strong> {_safe(prioridad)}</p>
-                            <p style='margin: 5px 0; color: #666;'>{_safe(alerta.get('descripcion',''))}</p>
-                            <p style='margin: 8px 0 5px 0; background: #f5f5f5; padding: 8px; border-radius: 5px;'>
-                                <strong>💡 Acción requerida:</strong> {_safe(alerta.get('accion_requerida',''))}
-                            </p>
-                            <p style='margin: 5px 0 0 0; color: #888; font-size: 12px;'>
-                                ⏰ Días para acción: {_safe(alerta.get('dias_para_accion',''))} |
-                                {'📋 Requiere reporte UIAF' if alerta.get('requiere_reporte_uiaf', False) else '✅ No requiere reporte'}
-                            </p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
+                # HTML renderizado una vez por análisis; en reruns se reutiliza con un solo st.markdown
+                cache_html = st.session_state.setdefault("cache_html_alertas", {})
+                html_alertas = cache_html.get(clave_riesgo)
+                if html_alertas is None:
+                    html_alertas = cache_html[clave_riesgo] = _html_alertas_prioritarias(importantes)
+                st.markdown(html_alertas, unsafe_allow_html=True)
             else:
                 st.info("No hay alertas Críticas/Altas.")
 
             with st.expander(f"📋 Ver todas las alertas ({len(alertas)})"):
-                for alerta in alertas:
-                    st.markdown(f"**{_safe(alerta.get('tipo',''))}** - {_safe(alerta.get('titulo',''))} ({_safe(alerta.get('prioridad',''))})")
-                    st.caption(_safe(alerta.get("descripcion", "")))
-                    st.markdown("---")
+                # Un solo elemento en vez de 3 por alerta (se envían aunque el expander esté cerrado)
+                st.markdown(
+                    "".join(
+                        f"<div><b>{_safe(a.get('tipo',''))}</b> - {_safe(a.get('titulo',''))} ({_safe(a.get('prioridad',''))})"
+                        f"<div style='color: #666; font-size: 12px;'>{_safe(a.get('descripcion', ''))}</div><hr></div>"
+                        for a in alertas
+                    ),
+                    unsafe_allow_html=True,
+                )
         else:
             st.success("✅ No se detectaron alertas de riesgo para este cliente")
 
@@ -3414,21 +3542,12 @@ for idx, cliente in enumerate(lista_clientes):
 
             with m1:
                 st.markdown("**Riesgo Inherente (sin controles)**")
-                for categoria, valor in (matriz.get("riesgo_inherente", {}) or {}).items():
-                    try:
-                        v = float(valor)
-                    except Exception:
-                        v = 0.0
-                    st.progress(min(max(v, 0), 100) / 100, text=f"{categoria.capitalize()}: {v:.0f}/100")
+                # Una sola llamada en vez de un st.progress por categoría
+                st.markdown(_barras_riesgo_html(matriz.get("riesgo_inherente", {})), unsafe_allow_html=True)
 
             with m2:
                 st.markdown("**Riesgo Residual (con controles)**")
-                for categoria, valor in (matriz.get("riesgo_residual", {}) or {}).items():
-                    try:
-                        v = float(valor)
-                    except Exception:
-                        v = 0.0
-                    st.progress(min(max(v, 0), 100) / 100, text=f"{categoria.capitalize()}: {v:.0f}/100")
+                st.markdown(_barras_riesgo_html(matriz.get("riesgo_residual", {})), unsafe_allow_html=True)
 
             st.markdown("#### Controles Aplicados")
             for control in (matriz.get("controles_aplicados", []) or []):
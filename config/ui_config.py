@@ -3,6 +3,9 @@ Configuración de UI - AdamoPay
 Edita estos valores para cambiar tamaños de fuente y estilos en toda la app
 """
 
+from functools import lru_cache
+from types import MappingProxyType
+
 # ====================================
 # CONFIGURACIÓN DE FUENTES
 # ====================================
@@ -103,11 +106,24 @@ TEMAS = {
 TEMA_ACTIVO = None  # None = usar valores personalizados, o elige un tema: "Estándar", "Grande", etc.
 
 
+def _solo_lectura(valor):
+    """Envuelve un dict (y los dicts anidados) en vistas MappingProxyType de solo lectura"""
+    if isinstance(valor, dict):
+        return MappingProxyType({clave: _solo_lectura(v) for clave, v in valor.items()})
+    return valor
+
+
+@lru_cache(maxsize=1)
 def obtener_configuracion():
-    """Retorna la configuración activa (tema o personalizado)"""
+    """
+    Retorna la configuración activa (tema o personalizado)
+
+    Se calcula una sola vez por proceso; el resultado es de solo lectura en
+    todos sus niveles porque se comparte entre todos los reruns de Streamlit.
+    """
     if TEMA_ACTIVO and TEMA_ACTIVO in TEMAS:
         tema = TEMAS[TEMA_ACTIVO]
-        return {
+        return _solo_lectura({
             "fuentes": {
                 "h1": tema["h1"],
                 "h2": tema["h2"],
@@ -136,10 +152,10 @@ def obtener_configuracion():
                 "padding": "12px 16px",
                 "columnas": 4,
             },
-        }
+        })
     else:
         # Configuración personalizada
-        return {
+        return _solo_lectura({
             "fuentes": FUENTES,
             "texto": TEXTO,
             "metricas": METRICAS,
@@ -147,4 +163,4 @@ def obtener_configuracion():
             "componentes": COMPONENTES,
             "colores": COLORES,
             "layout": LAYOUT,
-        }
+        })
@@ -15,7 +15,12 @@ from .base_characterization import (
     obtener_resumen_caracterizacion
 )
 from .gafi_profile import clasificar_perfil_gafi, obtener_recomendaciones_gafi, calcular_tendencia_riesgo
-from .behavior_metrics import calcular_metricas_comportamiento, detectar_patrones_anomalos, analizar_estacionalidad
+from .behavior_metrics import (
+    calcular_metricas_comportamiento,
+    detectar_patrones_anomalos,
+    analizar_estacionalidad,
+    analizar_cliente_completo
+)
 from .risk_flags import evaluar_banderas_riesgo, calcular_score_riesgo
 from .contracts import (
     PerfilGAFI,
@@ -40,6 +45,7 @@ __all__ = [
     'calcular_metricas_comportamiento',
     'detectar_patrones_anomalos',
     'analizar_estacionalidad',
+    'analizar_cliente_completo',
     # Banderas de riesgo
     'evaluar_banderas_riesgo',
     'calcular_score_riesgo',
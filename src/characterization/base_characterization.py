@@ -6,24 +6,82 @@ Implementa caracterización inicial basada en tres pilares:
 - Materialidad financiera
 
 📌 CONTRATO:
-- Recibe: pandas.DataFrame (df_cliente)
+- Recibe: pandas.DataFrame (df_cliente); FECHA idealmente ya en datetime64[ns]
+  (si no, se convierte con pd.to_datetime en cada llamada)
 - Devuelve: dict estructurado
 - NO usa Streamlit
 """
 
+import re
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 
+# Patrones de clasificación de ESTADO (compilados una sola vez)
+_RE_REJ = re.compile(r'rechaz|retor', re.IGNORECASE)
+_RE_OK = re.compile(r'pagado|validado', re.IGNORECASE)
 
-def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
+
+@lru_cache(maxsize=1024)
+def _clasificar_estado(estado: str) -> Tuple[bool, bool]:
+    """
+    (es_rechazo, es_exitosa) de un valor de ESTADO
+    
+    El vocabulario de estados es pequeño y se repite entre clientes: cada valor
+    distinto pasa por las regex una sola vez y luego es una búsqueda en el caché.
+    """
+    return _RE_REJ.search(estado) is not None, _RE_OK.search(estado) is not None
+
+
+# Nanosegundos por día (ventanas y días de actividad sobre FECHA en ns)
+_NS_DIA = 24 * 60 * 60 * 1_000_000_000
+
+# Rechazo/retorno del perfil GAFI, banderas y métricas de comportamiento
+# (criterio de str.lower().str.contains('rechazado|retornado'))
+_RE_RECHAZO = re.compile(r'rechazado|retornado', re.IGNORECASE)
+
+
+def _mascara_rechazo(estados: pd.Series, patron: re.Pattern = _RE_RECHAZO) -> np.ndarray:
+    """Máscara de filas cuyo ESTADO cumple el patrón, evaluándolo una vez por ESTADO distinto"""
+    codigos, estados_unicos = pd.factorize(estados)
+    # El código -1 (nulo) toma el False final; valores no texto no cumplen
+    coincide = np.array(
+        [isinstance(e, str) and patron.search(e) is not None for e in estados_unicos] + [False],
+        dtype=bool
+    )
+    return coincide[codigos]
+
+
+def _fechas_datetime64(fechas: pd.Series) -> np.ndarray:
+    """
+    FECHA como ndarray datetime64[ns] (NaT para inválidas)
+    
+    Solo se parsea con pd.to_datetime si la columna aún no es datetime; las fechas
+    con zona horaria se dejan en hora local sin zona.
+    """
+    if fechas.dtype.kind != 'M':
+        fechas = pd.to_datetime(fechas, errors='coerce')
+    if isinstance(fechas.dtype, pd.DatetimeTZDtype):
+        fechas = fechas.dt.tz_localize(None)
+    return fechas.to_numpy()
+
+
+def caracterizar_cliente_gafi(
+    df_cliente: pd.DataFrame,
+    _timestamp: Optional[str] = None,
+    include_perfil: bool = True
+) -> Dict[str, Any]:
     """
     Caracterización completa basada en enfoque GAFI (riesgo, comportamiento, materialidad)
     OPTIMIZADO: Calcula métricas una sola vez y las reutiliza
     
     Args:
         df_cliente: DataFrame con transacciones del cliente
+        _timestamp: Marca ISO ya calculada (procesos por lote); si es None se usa datetime.now()
+        include_perfil: Si es False no se construyen las distribuciones ni el perfil
+            transaccional (perfil_transaccional = {}); score, banderas y métricas no cambian
         
     Returns:
         Dict con estructura:
@@ -45,7 +103,7 @@ def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
     
     # Validar entrada
     if df_cliente is None or df_cliente.empty:
-        return _crear_respuesta_vacia()
+        return _crear_respuesta_vacia(_timestamp)
     
     # ====== CÁLCULOS BASE (UNA SOLA VEZ) ======
     total_tx = len(df_cliente)
@@ -57,12 +115,12 @@ def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
     frecuencia_diaria = 0
     
     if 'FECHA' in df_cliente.columns:
-        df_temp = df_cliente.copy()
-        df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-        fechas_validas = df_temp['FECHA'].dropna()
-        if len(fechas_validas) > 0:
-            fecha_primera_tx = fechas_validas.min()
-            fecha_ultima_tx = fechas_validas.max()
+        # Solo se necesita la columna FECHA: sin copiar el DataFrame completo
+        fechas = _fechas_datetime64(df_cliente['FECHA'])
+        fechas = fechas[~np.isnat(fechas)]
+        if fechas.size > 0:
+            fecha_primera_tx = pd.Timestamp(fechas.min())
+            fecha_ultima_tx = pd.Timestamp(fechas.max())
             dias_activo = (fecha_ultima_tx - fecha_primera_tx).days
             if dias_activo > 0:
                 frecuencia_diaria = total_tx / dias_activo
@@ -76,35 +134,57 @@ def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
     desviacion_std = 0.0
     
     if 'MONTO (COP)' in df_cliente.columns:
-        montos = df_cliente['MONTO (COP)'].dropna()
-        if len(montos) > 0:
-            monto_total = float(montos.sum())
-            monto_promedio = float(montos.mean())
-            monto_mediana = float(montos.median())
+        # Un solo ndarray float64 sin NaN; todas las estadísticas salen de él
+        montos = df_cliente['MONTO (COP)'].to_numpy(dtype=np.float64, na_value=np.nan)
+        montos = montos[~np.isnan(montos)]
+        n_montos = montos.size
+        if n_montos > 0:
+            suma_montos = montos.sum()
+            monto_total = float(suma_montos)
+            monto_promedio = float(suma_montos / n_montos)
+            monto_mediana = float(np.median(montos))
             monto_min = float(montos.min())
             monto_max = float(montos.max())
-            desviacion_std = float(montos.std()) if len(montos) > 1 else 0.0
+            if n_montos > 1:
+                # Suma de cuadrados con un producto punto en lugar de montos.std(), que
+                # materializa los cuadrados; se centra en la media para no perder precisión
+                desvios = montos - monto_promedio
+                desviacion_std = float(np.sqrt(np.dot(desvios, desvios) / (n_montos - 1)))
     
-    # Distribuciones (UNA SOLA VEZ)
+    # Distribuciones (UNA SOLA VEZ; sin perfil solo se necesita la diversidad)
     tipos_tx = {}
+    diversidad_tipos = 0
     if 'TIPO DE TRA' in df_cliente.columns:
-        tipos_tx = df_cliente['TIPO DE TRA'].value_counts().to_dict()
-        tipos_tx = {str(k): int(v) for k, v in tipos_tx.items()}
+        if include_perfil:
+            # Directo desde la Series (sin dict intermedio de to_dict); v > 0 porque con
+            # dtype category value_counts incluye categorías no observadas
+            conteo_tipos = df_cliente['TIPO DE TRA'].value_counts()
+            tipos_tx = {str(k): int(v) for k, v in conteo_tipos.items() if v > 0}
+            diversidad_tipos = len(tipos_tx)
+        else:
+            diversidad_tipos = int(df_cliente['TIPO DE TRA'].nunique(dropna=True))
     
     estados_tx = {}
     tasa_rechazo = 0.0
     tx_exitosas = 0
     if 'ESTADO' in df_cliente.columns:
-        estados_tx = df_cliente['ESTADO'].value_counts().to_dict()
-        estados_tx = {str(k): int(v) for k, v in estados_tx.items()}
-        rechazos = df_cliente['ESTADO'].str.lower().str.contains('rechaz|retor', na=False).sum()
+        # Clasificación sobre los estados únicos (pocos) y conteo por código entero
+        codigos, estados_unicos = pd.factorize(df_cliente['ESTADO'])
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(estados_unicos))
+        if include_perfil:
+            orden = np.argsort(-conteos, kind='stable')
+            estados_tx = {str(estados_unicos[i]): int(conteos[i]) for i in orden}
+        clases = [_clasificar_estado(str(estado)) for estado in estados_unicos]
+        es_rechazo = np.array([rechazo for rechazo, _ in clases], dtype=bool)
+        es_exitosa = np.array([exitosa for _, exitosa in clases], dtype=bool)
+        rechazos = int(conteos[es_rechazo].sum())
         tasa_rechazo = (rechazos / total_tx * 100) if total_tx > 0 else 0.0
-        tx_exitosas = df_cliente['ESTADO'].str.lower().str.contains('pagado|validado', na=False).sum()
+        tx_exitosas = int(conteos[es_exitosa].sum())
     
     tipos_persona = {}
-    if 'TIPO_PERSONA' in df_cliente.columns:
-        tipos_persona = df_cliente['TIPO_PERSONA'].value_counts().to_dict()
-        tipos_persona = {str(k): int(v) for k, v in tipos_persona.items()}
+    if include_perfil and 'TIPO_PERSONA' in df_cliente.columns:
+        conteo_persona = df_cliente['TIPO_PERSONA'].value_counts()
+        tipos_persona = {str(k): int(v) for k, v in conteo_persona.items() if v > 0}
     
     # ====== MÉTRICAS CONSOLIDADAS (REUTILIZABLES) ======
     metricas = {
@@ -121,7 +201,7 @@ def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
         'monto_maximo': monto_max,
         'desviacion_std': desviacion_std,
         'tasa_rechazo': round(tasa_rechazo, 2),
-        'diversidad_tipos': len(tipos_tx)
+        'diversidad_tipos': diversidad_tipos
     }
     
     # ====== SCORE DE RIESGO (REUTILIZA MÉTRICAS) ======
@@ -130,16 +210,18 @@ def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
     # ====== BANDERAS DE RIESGO (REUTILIZA MÉTRICAS) ======
     banderas = _detectar_banderas_optimizado(metricas)
     
+    # Alias con los nombres que leen obtener_resumen_caracterizacion y la cartera
+    metricas['volumen_total'] = metricas['monto_total']
+    metricas['ticket_promedio'] = metricas['monto_promedio']
+    metricas['dias_operacion'] = metricas['dias_activo']
+    metricas['frecuencia_operacional'] = metricas['frecuencia_diaria']
+    metricas['cantidad_banderas'] = len(banderas)
+    
     # ====== NIVEL DE RIESGO ======
-    if score >= 70:
-        nivel_riesgo = "Alto"
-    elif score >= 40:
-        nivel_riesgo = "Medio"
-    else:
-        nivel_riesgo = "Bajo"
+    nivel_riesgo = _nivel_riesgo_desde_score(score)
     
     # ====== PERFIL TRANSACCIONAL ======
-    perfil = {
+    perfil = {} if not include_perfil else {
         "actividad": {
             "total_transacciones": int(total_tx),
             "tx_exitosas": int(tx_exitosas),
@@ -163,7 +245,7 @@ def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
             "estados": estados_tx,
             "tipo_persona": tipos_persona,
             "tasa_rechazo": round(tasa_rechazo, 2),
-            "diversidad_tipos": len(tipos_tx)
+            "diversidad_tipos": diversidad_tipos
         }
     }
     
@@ -173,12 +255,45 @@ def caracterizar_cliente_gafi(df_cliente: pd.DataFrame) -> Dict[str, Any]:
         "perfil_transaccional": perfil,
         "banderas_riesgo": banderas,
         "metricas_consolidadas": metricas,
-        "timestamp_analisis": datetime.now().isoformat(),
+        "timestamp_analisis": _timestamp or datetime.now().isoformat(),
         "tiene_datos": True,
         "mensaje": "Caracterización completada exitosamente"
     }
 
 
+# Cortes de nivel de riesgo sobre el score 0-100
+_SCORE_NIVEL_ALTO = 70
+_SCORE_NIVEL_MEDIO = 40
+
+# Umbrales de las banderas (compartidos por la detección individual y la de cartera)
+_UMBRAL_VOLUMEN_ALTO = 500_000_000
+_UMBRAL_TICKET_ALTO = 20_000_000
+_UMBRAL_FRECUENCIA_ALTA = 20
+_UMBRAL_RECHAZO_ELEVADO = 15
+_UMBRAL_TX_POR_DIA = 50
+_UMBRAL_DIVERSIDAD = 4
+
+
+def _nivel_riesgo_desde_score(score: int) -> str:
+    """Traduce el score 0-100 al nivel de riesgo inicial"""
+    if score >= _SCORE_NIVEL_ALTO:
+        return "Alto"
+    elif score >= _SCORE_NIVEL_MEDIO:
+        return "Medio"
+    return "Bajo"
+
+
+# Tramos del score: (métrica, ((umbral, puntos), ...)) de mayor a menor, comparando con '>'.
+# diversidad_tipos es entera, así que '> 3' equivale a '>= 4'.
+_TRAMOS_SCORE = (
+    ('monto_total', ((500_000_000, 25), (100_000_000, 15), (10_000_000, 5))),      # Volumen (0-25)
+    ('frecuencia_diaria', ((20, 20), (10, 12), (5, 5))),                           # Frecuencia (0-20)
+    ('monto_promedio', ((20_000_000, 20), (5_000_000, 12), (1_000_000, 5))),       # Ticket (0-20)
+    ('diversidad_tipos', ((3, 15), (2, 10), (1, 5))),                              # Diversidad (0-15)
+    ('tasa_rechazo', ((15, 20), (10, 12), (5, 5))),                                # Rechazo (0-20)
+)
+
+
 def _calcular_score_riesgo_optimizado(metricas: Dict) -> int:
     """
     Calcula score de riesgo reutilizando métricas ya calculadas
@@ -190,46 +305,12 @@ def _calcular_score_riesgo_optimizado(metricas: Dict) -> int:
         int: Score de 0-100
     """
     score = 0
-    
-    # Factor 1: Volumen (0-25 puntos)
-    if metricas['monto_total'] > 500_000_000:  # > $500M
-        score += 25
-    elif metricas['monto_total'] > 100_000_000:  # > $100M
-        score += 15
-    elif metricas['monto_total'] > 10_000_000:  # > $10M
-        score += 5
-    
-    # Factor 2: Frecuencia (0-20 puntos)
-    if metricas['frecuencia_diaria'] > 20:
-        score += 20
-    elif metricas['frecuencia_diaria'] > 10:
-        score += 12
-    elif metricas['frecuencia_diaria'] > 5:
-        score += 5
-    
-    # Factor 3: Ticket promedio (0-20 puntos)
-    if metricas['monto_promedio'] > 20_000_000:  # > $20M
-        score += 20
-    elif metricas['monto_promedio'] > 5_000_000:  # > $5M
-        score += 12
-    elif metricas['monto_promedio'] > 1_000_000:  # > $1M
-        score += 5
-    
-    # Factor 4: Diversidad (0-15 puntos)
-    if metricas['diversidad_tipos'] >= 4:
-        score += 15
-    elif metricas['diversidad_tipos'] >= 3:
-        score += 10
-    elif metricas['diversidad_tipos'] >= 2:
-        score += 5
-    
-    # Factor 5: Tasa de rechazo (0-20 puntos)
-    if metricas['tasa_rechazo'] > 15:
-        score += 20
-    elif metricas['tasa_rechazo'] > 10:
-        score += 12
-    elif metricas['tasa_rechazo'] > 5:
-        score += 5
+    for metrica, tramos in _TRAMOS_SCORE:
+        valor = metricas[metrica]
+        for umbral, puntos in tramos:
+            if valor > umbral:
+                score += puntos
+                break
     
     return min(score, 100)
 
@@ -247,119 +328,210 @@ def _detectar_banderas_optimizado(metricas: Dict) -> list:
     banderas = []
     
     # Bandera 1: Volumen alto
-    if metricas['monto_total'] > 500_000_000:
+    if metricas['monto_total'] > _UMBRAL_VOLUMEN_ALTO:
         banderas.append({
             'tipo': 'Volumen Alto',
             'severidad': 'Alta',
             'descripcion': f'Volumen total de ${metricas["monto_total"]:,.0f} supera umbral de $500M',
             'accion': 'Revisar origen de fondos y justificación de montos',
             'valor': metricas['monto_total'],
-            'umbral': 500_000_000
+            'umbral': _UMBRAL_VOLUMEN_ALTO
         })
     
     # Bandera 2: Ticket promedio alto
-    if metricas['monto_promedio'] > 20_000_000:
+    if metricas['monto_promedio'] > _UMBRAL_TICKET_ALTO:
         banderas.append({
             'tipo': 'Ticket Alto',
             'severidad': 'Media',
             'descripcion': f'Promedio de ${metricas["monto_promedio"]:,.0f} por TX supera $20M',
             'accion': 'Validar justificación de montos altos recurrentes',
             'valor': metricas['monto_promedio'],
-            'umbral': 20_000_000
+            'umbral': _UMBRAL_TICKET_ALTO
         })
     
     # Bandera 3: Alta frecuencia
-    if metricas['frecuencia_diaria'] > 20:
+    if metricas['frecuencia_diaria'] > _UMBRAL_FRECUENCIA_ALTA:
         banderas.append({
             'tipo': 'Frecuencia Alta',
             'severidad': 'Media',
             'descripcion': f'{metricas["frecuencia_diaria"]:.1f} TX/día supera umbral de 20',
             'accion': 'Revisar patrones de transaccionalidad y horarios',
             'valor': metricas['frecuencia_diaria'],
-            'umbral': 20
+            'umbral': _UMBRAL_FRECUENCIA_ALTA
         })
     
     # Bandera 4: Tasa de rechazo alta
-    if metricas['tasa_rechazo'] > 15:
+    if metricas['tasa_rechazo'] > _UMBRAL_RECHAZO_ELEVADO:
         banderas.append({
             'tipo': 'Rechazos Elevados',
             'severidad': 'Alta',
             'descripcion': f'Tasa de rechazo de {metricas["tasa_rechazo"]:.1f}% supera 15%',
             'accion': 'Investigar causas de rechazos y posible fragmentación',
             'valor': metricas['tasa_rechazo'],
-            'umbral': 15
+            'umbral': _UMBRAL_RECHAZO_ELEVADO
         })
     
     # Bandera 5: Actividad concentrada
     if metricas['dias_activo'] > 0:
         tx_por_dia = metricas['total_transacciones'] / metricas['dias_activo']
-        if tx_por_dia > 50:
+        if tx_por_dia > _UMBRAL_TX_POR_DIA:
             banderas.append({
                 'tipo': 'Actividad Concentrada',
                 'severidad': 'Media',
                 'descripcion': 'Actividad transaccional muy concentrada en pocos días',
                 'accion': 'Verificar justificación de concentración temporal',
                 'valor': tx_por_dia,
-                'umbral': 50
+                'umbral': _UMBRAL_TX_POR_DIA
             })
     
     # Bandera 6: Alta diversidad de tipos
-    if metricas['diversidad_tipos'] >= 4:
+    if metricas['diversidad_tipos'] >= _UMBRAL_DIVERSIDAD:
         banderas.append({
             'tipo': 'Diversidad de Operaciones',
             'severidad': 'Baja',
             'descripcion': f'{metricas["diversidad_tipos"]} tipos diferentes de transacciones',
             'accion': 'Monitorear coherencia con actividad económica declarada',
             'valor': metricas['diversidad_tipos'],
-            'umbral': 4
+            'umbral': _UMBRAL_DIVERSIDAD
         })
     
     return banderas
 
 
-def _crear_respuesta_vacia() -> Dict[str, Any]:
+# Plantilla de respuesta vacía, construida una sola vez al importar el módulo.
+# Los dicts/listas anidados se comparten entre respuestas: tratarlos como solo lectura.
+_EMPTY_TEMPLATE: Dict[str, Any] = {
+    "nivel_riesgo_inicial": "No Evaluado",
+    "score_riesgo": 0,
+    "perfil_transaccional": {
+        "actividad": {
+            "total_transacciones": 0,
+            "tx_exitosas": 0,
+            "dias_activo": 0,
+            "fecha_primera": "N/A",
+            "fecha_ultima": "N/A",
+            "frecuencia_diaria": 0
+        },
+        "materialidad": {
+            "monto_total": 0,
+            "monto_promedio": 0,
+            "monto_mediana": 0,
+            "monto_minimo": 0,
+            "monto_maximo": 0,
+            "desviacion_estandar": 0,
+            "coeficiente_variacion": 0,
+            "rango_montos": 0
+        },
+        "comportamiento": {
+            "tipos_transaccion": {},
+            "estados": {},
+            "tipo_persona": {},
+            "tasa_rechazo": 0,
+            "diversidad_tipos": 0
+        }
+    },
+    "banderas_riesgo": [],
+    "metricas_consolidadas": {},
+    "tiene_datos": False,
+    "mensaje": "Sin datos para caracterizar"
+}
+
+
+def _crear_respuesta_vacia(_timestamp: Optional[str] = None) -> Dict[str, Any]:
     """
     Respuesta segura cuando no hay datos para caracterizar
     
+    Args:
+        _timestamp: Marca ISO ya calculada; si es None se usa datetime.now()
+    
     Returns:
-        Dict con estructura completa pero valores vacíos/cero
+        Dict con estructura completa pero valores vacíos/cero (anidados de solo lectura)
     """
-    return {
-        "nivel_riesgo_inicial": "No Evaluado",
-        "score_riesgo": 0,
-        "perfil_transaccional": {
-            "actividad": {
-                "total_transacciones": 0,
-                "tx_exitosas": 0,
-                "dias_activo": 0,
-                "fecha_primera": "N/A",
-                "fecha_ultima": "N/A",
-                "frecuencia_diaria": 0
-            },
-            "materialidad": {
-                "monto_total": 0,
-                "monto_promedio": 0,
-                "monto_mediana": 0,
-                "monto_minimo": 0,
-                "monto_maximo": 0,
-                "desviacion_estandar": 0,
-                "coeficiente_variacion": 0,
-                "rango_montos": 0
-            },
-            "comportamiento": {
-                "tipos_transaccion": {},
-                "estados": {},
-                "tipo_persona": {},
-                "tasa_rechazo": 0,
-                "diversidad_tipos": 0
-            }
-        },
-        "banderas_riesgo": [],
-        "metricas_consolidadas": {},
-        "timestamp_analisis": datetime.now().isoformat(),
-        "tiene_datos": False,
-        "mensaje": "Sin datos para caracterizar"
-    }
+    return {**_EMPTY_TEMPLATE, "timestamp_analisis": _timestamp or datetime.now().isoformat()}
+
+
+def _metricas_por_cliente(df_completo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula, para todos los clientes a la vez, las métricas que consumen
+    _calcular_score_riesgo_optimizado y _detectar_banderas_optimizado
+    
+    Args:
+        df_completo: DataFrame con todas las transacciones (columna CLIENTE)
+        
+    Returns:
+        DataFrame indexado por CLIENTE con las mismas reglas que caracterizar_cliente_gafi()
+    """
+    # Proyección: solo las columnas que usan las reglas, en un DataFrame angosto que
+    # se agrupa una única vez. CLIENTE y TIPO DE TRA conservan su array (si llegan
+    # como category se agrupa/cuenta sobre los códigos sin materializar strings)
+    columnas = {'CLIENTE': df_completo['CLIENTE'].array}
+    agregaciones = {}
+    
+    if 'MONTO (COP)' in df_completo.columns:
+        columnas['monto'] = df_completo['MONTO (COP)'].to_numpy(dtype=np.float64, na_value=np.nan)
+        agregaciones['monto_total'] = ('monto', 'sum')
+        agregaciones['monto_promedio'] = ('monto', 'mean')
+    
+    if 'FECHA' in df_completo.columns:
+        columnas['fecha'] = _fechas_datetime64(df_completo['FECHA'])
+        agregaciones['fecha_min'] = ('fecha', 'min')
+        agregaciones['fecha_max'] = ('fecha', 'max')
+    
+    if 'ESTADO' in df_completo.columns:
+        columnas['rechazo'] = _mascara_rechazo(df_completo['ESTADO'], _RE_REJ)
+        agregaciones['rechazos'] = ('rechazo', 'sum')
+    
+    if 'TIPO DE TRA' in df_completo.columns:
+        columnas['tipo'] = df_completo['TIPO DE TRA'].array
+        agregaciones['diversidad_tipos'] = ('tipo', 'nunique')
+    
+    grupos = pd.DataFrame(columnas).groupby('CLIENTE', sort=False, observed=True)
+    total_tx = grupos.size()
+    agregado = grupos.agg(**agregaciones) if agregaciones else pd.DataFrame(index=total_tx.index)
+    
+    metricas = pd.DataFrame({'total_transacciones': total_tx})
+    metricas['monto_total'] = agregado['monto_total'] if 'monto_total' in agregado else 0.0
+    metricas['monto_promedio'] = agregado['monto_promedio'].fillna(0.0) if 'monto_promedio' in agregado else 0.0
+    
+    metricas['dias_activo'] = 0
+    metricas['frecuencia_diaria'] = 0.0
+    if 'fecha_min' in agregado:
+        dias = (agregado['fecha_max'] - agregado['fecha_min']).dt.days.fillna(0).astype(int)
+        metricas['dias_activo'] = dias
+        metricas['frecuencia_diaria'] = np.where(dias > 0, total_tx / dias.where(dias > 0, 1), 0.0)
+    
+    metricas['tasa_rechazo'] = agregado['rechazos'] / total_tx * 100 if 'rechazos' in agregado else 0.0
+    metricas['diversidad_tipos'] = agregado['diversidad_tipos'] if 'diversidad_tipos' in agregado else 0
+    
+    # Mismo redondeo (round de Python) que las métricas consolidadas por cliente
+    for columna in ('frecuencia_diaria', 'tasa_rechazo'):
+        metricas[columna] = metricas[columna].map(lambda v: round(v, 2))
+    
+    return metricas
+
+
+def _score_vectorizado(metricas: pd.DataFrame) -> np.ndarray:
+    """Aplica _TRAMOS_SCORE a todas las filas de métricas (equivale a _calcular_score_riesgo_optimizado)"""
+    score = np.zeros(len(metricas), dtype=np.int64)
+    for metrica, tramos in _TRAMOS_SCORE:
+        valores = metricas[metrica].to_numpy()
+        score += np.select([valores > umbral for umbral, _ in tramos], [puntos for _, puntos in tramos], 0)
+    return np.minimum(score, 100)
+
+
+def _contar_banderas_vectorizado(metricas: pd.DataFrame) -> np.ndarray:
+    """Cuenta por fila las banderas que levantaría _detectar_banderas_optimizado"""
+    dias = metricas['dias_activo'].to_numpy()
+    tx_por_dia = np.where(dias > 0, metricas['total_transacciones'].to_numpy() / np.maximum(dias, 1), 0.0)
+    condiciones = (
+        metricas['monto_total'].to_numpy() > _UMBRAL_VOLUMEN_ALTO,
+        metricas['monto_promedio'].to_numpy() > _UMBRAL_TICKET_ALTO,
+        metricas['frecuencia_diaria'].to_numpy() > _UMBRAL_FRECUENCIA_ALTA,
+        metricas['tasa_rechazo'].to_numpy() > _UMBRAL_RECHAZO_ELEVADO,
+        tx_por_dia > _UMBRAL_TX_POR_DIA,
+        metricas['diversidad_tipos'].to_numpy() >= _UMBRAL_DIVERSIDAD,
+    )
+    return np.sum(condiciones, axis=0)
 
 
 def caracterizar_cartera_clientes(df_completo: pd.DataFrame, lista_clientes: list) -> Dict[str, Any]:
@@ -389,20 +561,33 @@ def caracterizar_cartera_clientes(df_completo: pd.DataFrame, lista_clientes: lis
         "No Evaluado": 0
     }
     
+    # Métricas de todos los clientes en una sola agregación agrupada;
+    # score, nivel y banderas se evalúan como columnas completas
+    metricas = _metricas_por_cliente(df_completo)
+    score = _score_vectorizado(metricas)
+    metricas['nivel_riesgo'] = np.select(
+        [score >= _SCORE_NIVEL_ALTO, score >= _SCORE_NIVEL_MEDIO], ["Alto", "Medio"], "Bajo"
+    )
+    metricas['cantidad_banderas'] = _contar_banderas_vectorizado(metricas)
+    resumen_clientes = metricas[
+        ['nivel_riesgo', 'total_transacciones', 'monto_total', 'cantidad_banderas']
+    ].to_dict('index')
+    
+    # Cliente sin transacciones: mismo resultado que _crear_respuesta_vacia()
+    sin_datos = {'nivel_riesgo': "No Evaluado", 'total_transacciones': 0, 'monto_total': 0, 'cantidad_banderas': 0}
+    
     for cliente in lista_clientes:
-        df_cliente = df_completo[df_completo['CLIENTE'] == cliente]
-        resultado = caracterizar_cliente_gafi(df_cliente)
-        
+        fila = resumen_clientes.get(cliente, sin_datos)
+        nivel = fila['nivel_riesgo']
         caracterizaciones.append({
             "cliente": cliente,
-            "nivel_riesgo": resultado['nivel_riesgo_inicial'],
-            "total_transacciones": resultado['metricas_consolidadas'].get('total_transacciones', 0),
-            "volumen_total": resultado['metricas_consolidadas'].get('volumen_total', 0),
-            "cantidad_banderas": resultado['metricas_consolidadas'].get('cantidad_banderas', 0)
+            "nivel_riesgo": nivel,
+            "total_transacciones": fila['total_transacciones'],
+            "volumen_total": fila['monto_total'],
+            "cantidad_banderas": fila['cantidad_banderas']
         })
         
         # Actualizar resumen de riesgos
-        nivel = resultado['nivel_riesgo_inicial']
         if nivel in resumen_riesgos:
             resumen_riesgos[nivel] += 1
     
@@ -8,18 +8,137 @@ Implementa:
 - Métricas de consistencia
 """
 
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from .base_characterization import _NS_DIA, _RE_RECHAZO
 
+# Clasificación de ESTADO (se aplica a los estados distintos, no a cada fila)
+_RE_EXITO = re.compile(r'pagado|validado', re.IGNORECASE)
 
-def calcular_metricas_comportamiento(df_cliente: pd.DataFrame) -> Dict:
+# Separación máxima entre TX consecutivas para contarlas como ráfaga (5 minutos en ns)
+_NS_RAFAGA = 5 * 60 * 1_000_000_000
+
+# Tablas del score de consistencia (umbrales ordenados -> penalización y factor por tramo)
+# CV: penaliza cv > umbral (bisect_left deja el umbral exacto en el tramo inferior)
+_CV_UMBRALES = (50, 100, 150)
+_CV_PENALIZACIONES = (0, 10, 20, 30)
+_CV_FACTORES = (
+    None,
+    'Moderada variabilidad en montos',
+    'Alta variabilidad en montos',
+    'Muy alta variabilidad en montos'
+)
+# Anomalías: penaliza total >= umbral (bisect_right)
+_ANOMALIAS_UMBRALES = (5, 10)
+_ANOMALIAS_PENALIZACIONES = (0, 15, 25)
+_ANOMALIAS_FACTORES = (None, 'Anomalías moderadas ({})', 'Múltiples anomalías detectadas ({})')
+# Tasa de éxito: penaliza tasa < umbral (bisect_right)
+_EXITO_UMBRALES = (70, 85)
+_EXITO_PENALIZACIONES = (20, 10, 0)
+_EXITO_FACTORES = ('Baja tasa de éxito ({:.1f}%)', 'Tasa de éxito moderada ({:.1f}%)', None)
+# Clasificación final: score >= umbral (bisect_right)
+_CLASIFICACION_UMBRALES = (40, 60, 80)
+_CLASIFICACIONES = (('Deficiente', '🔴'), ('Regular', '🟠'), ('Bueno', '🟡'), ('Excelente', '🟢'))
+
+# Nombres de mes como los devuelve .dt.month_name() (locale por defecto); las claves de
+# estacionalidad se recorren en orden alfabético, que es el orden en que las dejaba el groupby
+_NOMBRES_MES = (
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+)
+_MESES_ORDEN_ALFABETICO = tuple(sorted(range(12), key=lambda i: _NOMBRES_MES[i]))
+
+
+def _to_datetime_cached(fechas: pd.Series) -> pd.Series:
+    """
+    Convierte FECHA a datetime parseando cada valor distinto una sola vez
+    
+    Args:
+        fechas: Serie FECHA (texto, objetos fecha o ya datetime64)
+        
+    Returns:
+        Serie datetime con NaT para valores inválidos (mismo índice)
+    """
+    if fechas.dtype.kind == 'M':
+        return fechas
+    
+    codigos, unicos = pd.factorize(fechas)
+    parseados = pd.to_datetime(unicos, errors='coerce')
+    return pd.Series(
+        parseados.take(codigos, allow_fill=True, fill_value=pd.NaT),
+        index=fechas.index,
+        name=fechas.name
+    )
+
+
+def _distribucion(serie: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Conteo por valor con códigos enteros + np.bincount (equivale a value_counts())
+    
+    Args:
+        serie: Columna categórica del cliente (los nulos no se cuentan)
+        
+    Returns:
+        (valores, conteos) ordenados por conteo descendente; empates en orden de aparición
+    """
+    codigos, valores = pd.factorize(serie)
+    conteos = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+    orden = np.argsort(-conteos, kind='stable')
+    return np.asarray(valores, dtype=object)[orden], conteos[orden]
+
+
+@dataclass(slots=True, frozen=True)
+class _ClienteArrays:
+    """Columnas calientes del cliente extraídas una vez (None si la columna no existe)"""
+    montos: Optional[np.ndarray]   # MONTO (COP) en float64, NaN en nulos, orden de filas
+    fechas: Optional[pd.Series]    # FECHA parseada a datetime (NaT en inválidas)
+
+
+def _mediana_p95(montos: np.ndarray) -> Tuple[float, float]:
+    """
+    Mediana y percentil 95 con una sola selección parcial (np.partition, O(N))
+    
+    Args:
+        montos: Montos sin NaN (al menos uno)
+        
+    Returns:
+        (mediana, p95) con los mismos criterios que np.median y np.percentile (lineal)
+    """
+    n = montos.size
+    pos_95 = 0.95 * (n - 1)
+    k_95 = int(pos_95)
+    k_med = n // 2
+    kth = sorted({k_med - 1 if n % 2 == 0 else k_med, k_med, k_95, min(k_95 + 1, n - 1)})
+    parte = np.partition(montos, kth)
+    
+    mediana = parte[k_med] if n % 2 == 1 else (parte[k_med - 1] + parte[k_med]) / 2
+    p95 = parte[k_95] + (parte[min(k_95 + 1, n - 1)] - parte[k_95]) * (pos_95 - k_95)
+    return mediana, p95
+
+
+def _empaquetar(df_cliente: pd.DataFrame) -> _ClienteArrays:
+    """Extrae MONTO y FECHA del DataFrame del cliente una sola vez"""
+    montos = None
+    if 'MONTO (COP)' in df_cliente.columns:
+        montos = df_cliente['MONTO (COP)'].to_numpy(dtype=np.float64, na_value=np.nan)
+    fechas = None
+    if 'FECHA' in df_cliente.columns:
+        fechas = _to_datetime_cached(df_cliente['FECHA'])
+    return _ClienteArrays(montos=montos, fechas=fechas)
+
+
+def calcular_metricas_comportamiento(df_cliente: pd.DataFrame, _datos: Optional[_ClienteArrays] = None) -> Dict:
     """
     Calcula métricas detalladas del comportamiento transaccional
     
     Args:
         df_cliente: DataFrame con transacciones del cliente
+        _datos: Columnas ya extraídas (uso interno de analizar_cliente_completo)
         
     Returns:
         Dict con métricas de comportamiento
@@ -27,76 +146,98 @@ def calcular_metricas_comportamiento(df_cliente: pd.DataFrame) -> Dict:
     if df_cliente.empty:
         return {'error': 'Sin datos para analizar'}
     
+    datos = _datos if _datos is not None else _empaquetar(df_cliente)
+    columnas = set(df_cliente.columns)
     metricas = {}
     
     # Métricas básicas
     metricas['total_transacciones'] = len(df_cliente)
-    metricas['volumen_total'] = df_cliente['MONTO (COP)'].sum() if 'MONTO (COP)' in df_cliente.columns else 0
-    metricas['volumen_promedio'] = df_cliente['MONTO (COP)'].mean() if 'MONTO (COP)' in df_cliente.columns else 0
-    metricas['volumen_mediana'] = df_cliente['MONTO (COP)'].median() if 'MONTO (COP)' in df_cliente.columns else 0
-    
-    # Métricas de variabilidad
-    if 'MONTO (COP)' in df_cliente.columns:
-        metricas['desviacion_estandar'] = df_cliente['MONTO (COP)'].std()
-        metricas['coeficiente_variacion'] = (metricas['desviacion_estandar'] / metricas['volumen_promedio'] * 100) if metricas['volumen_promedio'] > 0 else 0
-        metricas['monto_minimo'] = df_cliente['MONTO (COP)'].min()
-        metricas['monto_maximo'] = df_cliente['MONTO (COP)'].max()
+    if datos.montos is None:
+        metricas['volumen_total'] = 0
+        metricas['volumen_promedio'] = 0
+        metricas['volumen_mediana'] = 0
+    else:
+        # Un solo ndarray float64 sin NaN; todas las estadísticas salen de él
+        # (sin datos válidos: suma 0 y NaN en el resto, como las reducciones de pandas)
+        montos = datos.montos[~np.isnan(datos.montos)]
+        n_montos = montos.size
+        suma = montos.sum()
+        promedio = suma / n_montos if n_montos > 0 else np.nan
+        
+        metricas['volumen_total'] = suma
+        metricas['volumen_promedio'] = promedio
+        if n_montos > 0:
+            metricas['volumen_mediana'], metricas['monto_p95'] = _mediana_p95(montos)
+        else:
+            metricas['volumen_mediana'] = metricas['monto_p95'] = np.nan
+        
+        # Métricas de variabilidad
+        if n_montos > 1:
+            desvios = montos - promedio
+            metricas['desviacion_estandar'] = np.sqrt(np.dot(desvios, desvios) / (n_montos - 1))
+        else:
+            metricas['desviacion_estandar'] = np.nan
+        metricas['coeficiente_variacion'] = (metricas['desviacion_estandar'] / promedio * 100) if promedio > 0 else 0
+        metricas['monto_minimo'] = montos.min() if n_montos > 0 else np.nan
+        metricas['monto_maximo'] = montos.max() if n_montos > 0 else np.nan
         metricas['rango'] = metricas['monto_maximo'] - metricas['monto_minimo']
     
     # Análisis temporal
-    if 'FECHA' in df_cliente.columns:
-        df_temp = df_cliente.copy()
-        df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-        df_temp = df_temp.dropna(subset=['FECHA'])
+    if datos.fechas is not None:
+        # Solo la serie FECHA (sin copiar el DataFrame)
+        fechas = datos.fechas.dropna()
         
-        if not df_temp.empty:
-            fecha_min = df_temp['FECHA'].min()
-            fecha_max = df_temp['FECHA'].max()
+        if not fechas.empty:
+            fecha_min = fechas.min()
+            fecha_max = fechas.max()
             dias_activo = (fecha_max - fecha_min).days + 1
             
             metricas['fecha_primera_tx'] = fecha_min.strftime('%Y-%m-%d')
             metricas['fecha_ultima_tx'] = fecha_max.strftime('%Y-%m-%d')
             metricas['dias_activo'] = dias_activo
-            metricas['frecuencia_diaria'] = len(df_temp) / max(dias_activo, 1)
+            metricas['frecuencia_diaria'] = len(fechas) / max(dias_activo, 1)
             
             # Análisis por día de la semana
-            df_temp['dia_semana'] = df_temp['FECHA'].dt.dayofweek
-            distribucion_dias = df_temp['dia_semana'].value_counts().sort_index()
+            distribucion_dias = np.bincount(fechas.dt.dayofweek.to_numpy(), minlength=7)
             dias_nombres = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-            metricas['distribucion_dias_semana'] = {dias_nombres[i]: int(distribucion_dias.get(i, 0)) for i in range(7)}
+            metricas['distribucion_dias_semana'] = {dias_nombres[i]: int(distribucion_dias[i]) for i in range(7)}
             
-            # Análisis por hora (si existe)
-            if df_temp['FECHA'].dt.time.notna().any():
-                df_temp['hora'] = df_temp['FECHA'].dt.hour
-                metricas['hora_promedio'] = df_temp['hora'].mean()
-                metricas['distribucion_horaria'] = df_temp['hora'].value_counts().sort_index().to_dict()
+            # Análisis por hora: fechas ya no tiene NaT, así que toda fila tiene hora
+            # (el antiguo filtro .dt.time.notna().any() siempre era verdadero aquí)
+            conteo_horas = np.bincount(fechas.dt.hour.to_numpy(), minlength=24)
+            metricas['hora_promedio'] = float(np.dot(np.arange(24), conteo_horas) / conteo_horas.sum())
+            metricas['distribucion_horaria'] = {h: int(conteo_horas[h]) for h in range(24) if conteo_horas[h] > 0}
     
     # Análisis de tipos de transacción
-    if 'TIPO DE TRA' in df_cliente.columns:
-        tipos_dist = df_cliente['TIPO DE TRA'].value_counts()
-        metricas['tipos_transaccion'] = tipos_dist.to_dict()
-        metricas['tipo_predominante'] = tipos_dist.index[0] if len(tipos_dist) > 0 else 'N/A'
-        metricas['diversidad_tipos'] = len(tipos_dist)
+    if 'TIPO DE TRA' in columnas:
+        tipos, conteos_tipos = _distribucion(df_cliente['TIPO DE TRA'])
+        metricas['tipos_transaccion'] = dict(zip(tipos.tolist(), conteos_tipos.tolist()))
+        metricas['tipo_predominante'] = tipos[0] if len(tipos) > 0 else 'N/A'
+        metricas['diversidad_tipos'] = len(tipos)
     
     # Análisis de estados
-    if 'ESTADO' in df_cliente.columns:
-        estados_dist = df_cliente['ESTADO'].value_counts()
-        metricas['distribucion_estados'] = estados_dist.to_dict()
+    if 'ESTADO' in columnas:
+        estados_unicos, conteos_estados = _distribucion(df_cliente['ESTADO'])
+        metricas['distribucion_estados'] = dict(zip(estados_unicos.tolist(), conteos_estados.tolist()))
         
         total_tx = len(df_cliente)
-        tx_exitosas = df_cliente['ESTADO'].str.lower().str.contains('pagado|validado', na=False).sum()
-        tx_rechazadas = df_cliente['ESTADO'].str.lower().str.contains('rechazado|retornado', na=False).sum()
+        # Las regex corren sobre los estados distintos y se suman sus conteos
+        estados = [str(estado) for estado in estados_unicos]
+        tx_exitosas = conteos_estados[[_RE_EXITO.search(e) is not None for e in estados]].sum()
+        tx_rechazadas = conteos_estados[[_RE_RECHAZO.search(e) is not None for e in estados]].sum()
         
         metricas['tasa_exito'] = (tx_exitosas / total_tx * 100) if total_tx > 0 else 0
         metricas['tasa_rechazo'] = (tx_rechazadas / total_tx * 100) if total_tx > 0 else 0
     
     # Análisis de beneficiarios
-    if 'TIPO_PERSONA' in df_cliente.columns:
-        personas_dist = df_cliente['TIPO_PERSONA'].value_counts()
-        metricas['distribucion_personas'] = personas_dist.to_dict()
+    if 'TIPO_PERSONA' in columnas:
+        personas, conteos_personas = _distribucion(df_cliente['TIPO_PERSONA'])
+        personas_dist = dict(zip(personas.tolist(), conteos_personas.tolist()))
+        metricas['distribucion_personas'] = personas_dist
         
-        tx_naturales = (df_cliente['TIPO_PERSONA'] == 'Natural').sum()
-        tx_juridicas = (df_cliente['TIPO_PERSONA'] == 'Jurídica').sum()
+        # Conteos tomados de la distribución ya calculada (sin comparar fila a fila)
+        tx_naturales = personas_dist.get('Natural', 0)
+        tx_juridicas = personas_dist.get('Jurídica', 0)
         total_tx = len(df_cliente)
         
         metricas['proporcion_naturales'] = (tx_naturales / total_tx * 100) if total_tx > 0 else 0
@@ -122,13 +263,18 @@ def calcular_metricas_comportamiento(df_cliente: pd.DataFrame) -> Dict:
     return metricas
 
 
-def detectar_patrones_anomalos(df_cliente: pd.DataFrame, umbral_std: float = 2.5) -> Dict:
+def detectar_patrones_anomalos(
+    df_cliente: pd.DataFrame,
+    umbral_std: float = 2.5,
+    _datos: Optional[_ClienteArrays] = None
+) -> Dict:
     """
     Detecta patrones anómalos en el comportamiento transaccional
     
     Args:
         df_cliente: DataFrame con transacciones del cliente
         umbral_std: Número de desviaciones estándar para considerar anomalía
+        _datos: Columnas ya extraídas (uso interno de analizar_cliente_completo)
         
     Returns:
         Dict con anomalías detectadas
@@ -144,82 +290,106 @@ def detectar_patrones_anomalos(df_cliente: pd.DataFrame, umbral_std: float = 2.5
     if df_cliente.empty or 'MONTO (COP)' not in df_cliente.columns:
         return anomalias
     
+    datos = _datos if _datos is not None else _empaquetar(df_cliente)
+    
     # 1. Detección de anomalías por monto
-    montos = df_cliente['MONTO (COP)'].dropna()
+    valores = datos.montos
+    montos = valores[~np.isnan(valores)]
     if len(montos) > 3:
         media_monto = montos.mean()
-        std_monto = montos.std()
+        std_monto = montos.std(ddof=1)
         
         if std_monto > 0:
-            # Transacciones con montos anómalos
-            df_anomalo = df_cliente[
-                (df_cliente['MONTO (COP)'] > media_monto + umbral_std * std_monto) |
-                (df_cliente['MONTO (COP)'] < media_monto - umbral_std * std_monto)
-            ]
+            # Transacciones con montos anómalos (posiciones; sin iterrows): una sola
+            # distancia |x - media| sirve para ambas colas y para la desviación
+            distancia = np.abs(valores - media_monto)
+            posiciones = np.flatnonzero(distancia > umbral_std * std_monto)
             
-            if not df_anomalo.empty:
-                for _, tx in df_anomalo.iterrows():
-                    anomalias['anomalias_monto'].append({
-                        'fecha': tx.get('FECHA', 'N/A'),
-                        'monto': tx.get('MONTO (COP)', 0),
-                        'desviacion': abs(tx.get('MONTO (COP)', 0) - media_monto) / std_monto if std_monto > 0 else 0,
-                        'tipo': 'Alto' if tx.get('MONTO (COP)', 0) > media_monto else 'Bajo'
-                    })
+            if posiciones.size > 0:
+                montos_anomalos = valores[posiciones]
+                desviaciones = distancia[posiciones] / std_monto
+                if datos.fechas is not None:
+                    fechas_anomalas = df_cliente['FECHA'].iloc[posiciones].tolist()
+                else:
+                    fechas_anomalas = ['N/A'] * posiciones.size
+                
+                anomalias['anomalias_monto'] = [
+                    {
+                        'fecha': fecha,
+                        'monto': monto,
+                        'desviacion': desviacion,
+                        'tipo': 'Alto' if monto > media_monto else 'Bajo'
+                    }
+                    for fecha, monto, desviacion in zip(
+                        fechas_anomalas, montos_anomalos.tolist(), desviaciones.tolist()
+                    )
+                ]
     
     # 2. Detección de anomalías de frecuencia
-    if 'FECHA' in df_cliente.columns:
-        df_temp = df_cliente.copy()
-        df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-        df_temp = df_temp.dropna(subset=['FECHA'])
+    if datos.fechas is not None:
+        # Solo la serie FECHA (sin copiar el DataFrame)
+        fechas = datos.fechas.dropna()
         
-        if not df_temp.empty:
-            # Agrupar por día
-            df_temp['fecha_simple'] = df_temp['FECHA'].dt.date
-            tx_por_dia = df_temp.groupby('fecha_simple').size()
+        if not fechas.empty:
+            # Marcas int64 (ns) ordenadas UNA vez: sirven para los días y para las ráfagas
+            # (con zona horaria, los días van en hora local y las ráfagas en UTC)
+            if fechas.dt.tz is not None:
+                ns_ordenados = np.sort(fechas.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]').view(np.int64))
+                ns_rafagas = np.sort(fechas.to_numpy(dtype='datetime64[ns]').view(np.int64))
+            else:
+                ns_ordenados = np.sort(fechas.to_numpy(dtype='datetime64[ns]').view(np.int64))
+                ns_rafagas = ns_ordenados
+            
+            # Agrupar por día: sobre marcas ordenadas cada día es un tramo contiguo
+            dia_tx = ns_ordenados // _NS_DIA
+            inicios = np.flatnonzero(np.r_[True, dia_tx[1:] != dia_tx[:-1]])
+            tx_por_dia = np.diff(np.r_[inicios, dia_tx.size])
+            dias = dia_tx[inicios].astype('datetime64[D]')
             
             if len(tx_por_dia) > 3:
                 media_diaria = tx_por_dia.mean()
-                std_diaria = tx_por_dia.std()
+                std_diaria = tx_por_dia.std(ddof=1)
                 
                 if std_diaria > 0:
-                    dias_anomalos = tx_por_dia[tx_por_dia > media_diaria + umbral_std * std_diaria]
+                    es_anomalo = tx_por_dia > media_diaria + umbral_std * std_diaria
+                    cantidades = tx_por_dia[es_anomalo]
+                    desviaciones_dia = (cantidades - media_diaria) / std_diaria
                     
-                    for fecha, cantidad in dias_anomalos.items():
-                        anomalias['anomalias_frecuencia'].append({
-                            'fecha': str(fecha),
-                            'cantidad_tx': int(cantidad),
+                    anomalias['anomalias_frecuencia'] = [
+                        {
+                            'fecha': fecha,
+                            'cantidad_tx': cantidad,
                             'promedio_normal': media_diaria,
-                            'desviacion': (cantidad - media_diaria) / std_diaria if std_diaria > 0 else 0
-                        })
+                            'desviacion': desviacion
+                        }
+                        for fecha, cantidad, desviacion in zip(
+                            np.datetime_as_string(dias[es_anomalo], unit='D').tolist(),
+                            cantidades.tolist(),
+                            desviaciones_dia.tolist()
+                        )
+                    ]
             
-            # 3. Detección de transacciones en horarios inusuales
-            if df_temp['FECHA'].dt.time.notna().any():
-                df_temp['hora'] = df_temp['FECHA'].dt.hour
-                
-                # Horario inusual: 00:00-05:00 o 22:00-23:59
-                tx_horario_inusual = df_temp[
-                    (df_temp['hora'] >= 0) & (df_temp['hora'] < 5) |
-                    (df_temp['hora'] >= 22)
-                ]
-                
-                if not tx_horario_inusual.empty:
-                    anomalias['anomalias_temporales'].append({
-                        'tipo': 'Horario inusual',
-                        'cantidad': len(tx_horario_inusual),
-                        'porcentaje': (len(tx_horario_inusual) / len(df_temp) * 100)
-                    })
+            # 3. Detección de transacciones en horarios inusuales (fechas sin NaT: siempre hay hora)
+            horas = fechas.dt.hour.to_numpy()
+            
+            # Horario inusual: 00:00-05:00 o 22:00-23:59
+            tx_horario_inusual = int(((horas >= 0) & (horas < 5) | (horas >= 22)).sum())
             
+            if tx_horario_inusual > 0:
+                anomalias['anomalias_temporales'].append({
+                    'tipo': 'Horario inusual',
+                    'cantidad': tx_horario_inusual,
+                    'porcentaje': (tx_horario_inusual / len(fechas) * 100)
+                })
+        
             # 4. Detección de ráfagas de transacciones
-            df_temp_sorted = df_temp.sort_values('FECHA')
-            if len(df_temp_sorted) > 1:
-                df_temp_sorted['tiempo_entre_tx'] = df_temp_sorted['FECHA'].diff().dt.total_seconds() / 60  # minutos
-                
-                # Más de 5 transacciones en menos de 5 minutos
-                rafagas = df_temp_sorted[df_temp_sorted['tiempo_entre_tx'] < 5]
-                if len(rafagas) > 5:
+            if len(fechas) > 1:
+                # Más de 5 transacciones en menos de 5 minutos (marcas ya ordenadas)
+                rafagas = int(np.count_nonzero(np.diff(ns_rafagas) < _NS_RAFAGA))
+                if rafagas > 5:
                     anomalias['anomalias_temporales'].append({
                         'tipo': 'Ráfaga de transacciones',
-                        'cantidad': len(rafagas),
+                        'cantidad': rafagas,
                         'detalle': 'Múltiples TX en corto período'
                     })
     
@@ -241,12 +411,13 @@ def detectar_patrones_anomalos(df_cliente: pd.DataFrame, umbral_std: float = 2.5
     return anomalias
 
 
-def analizar_estacionalidad(df_cliente: pd.DataFrame) -> Dict:
+def analizar_estacionalidad(df_cliente: pd.DataFrame, _datos: Optional[_ClienteArrays] = None) -> Dict:
     """
     Analiza patrones estacionales en las transacciones
     
     Args:
         df_cliente: DataFrame con transacciones del cliente
+        _datos: Columnas ya extraídas (uso interno de analizar_cliente_completo)
         
     Returns:
         Dict con análisis de estacionalidad
@@ -254,30 +425,40 @@ def analizar_estacionalidad(df_cliente: pd.DataFrame) -> Dict:
     if 'FECHA' not in df_cliente.columns or df_cliente.empty:
         return {'error': 'Sin datos temporales para analizar'}
     
-    df_temp = df_cliente.copy()
-    df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-    df_temp = df_temp.dropna(subset=['FECHA'])
+    # Solo la serie FECHA; las filas sin fecha válida se excluyen con una máscara
+    datos = _datos if _datos is not None else _empaquetar(df_cliente)
+    fechas = datos.fechas
+    validas = fechas.notna().to_numpy()
+    fechas = fechas[validas]
     
-    if df_temp.empty:
+    if fechas.empty:
         return {'error': 'Sin fechas válidas'}
     
     estacionalidad = {}
     
-    # Análisis por mes
-    df_temp['mes'] = df_temp['FECHA'].dt.month
-    df_temp['nombre_mes'] = df_temp['FECHA'].dt.month_name()
-    
-    tx_por_mes = df_temp.groupby('nombre_mes').size()
-    monto_por_mes = df_temp.groupby('nombre_mes')['MONTO (COP)'].sum() if 'MONTO (COP)' in df_temp.columns else None
+    # Análisis por mes: conteo y volumen con bincount sobre el número de mes (0-11)
+    mes = fechas.dt.month.to_numpy() - 1
+    conteo_mes = np.bincount(mes, minlength=12)
+    meses_activos = [i for i in _MESES_ORDEN_ALFABETICO if conteo_mes[i] > 0]
     
+    tx_por_mes = pd.Series(
+        conteo_mes[meses_activos],
+        index=[_NOMBRES_MES[i] for i in meses_activos],
+        dtype=np.int64
+    )
     estacionalidad['transacciones_por_mes'] = tx_por_mes.to_dict()
-    if monto_por_mes is not None:
-        estacionalidad['volumen_por_mes'] = monto_por_mes.to_dict()
-    
-    # Análisis por trimestre
-    df_temp['trimestre'] = df_temp['FECHA'].dt.quarter
-    tx_por_trimestre = df_temp.groupby('trimestre').size()
-    estacionalidad['transacciones_por_trimestre'] = {f'Q{k}': v for k, v in tx_por_trimestre.to_dict().items()}
+    if datos.montos is not None:
+        montos_validos = datos.montos[validas]
+        volumen_mes = np.bincount(
+            mes, weights=np.where(np.isnan(montos_validos), 0.0, montos_validos), minlength=12
+        )
+        estacionalidad['volumen_por_mes'] = {_NOMBRES_MES[i]: float(volumen_mes[i]) for i in meses_activos}
+    
+    # Análisis por trimestre (suma de los conteos mensuales de cada trimestre)
+    conteo_trimestre = conteo_mes.reshape(4, 3).sum(axis=1)
+    estacionalidad['transacciones_por_trimestre'] = {
+        f'Q{q + 1}': int(conteo_trimestre[q]) for q in range(4) if conteo_trimestre[q] > 0
+    }
     
     # Identificar mes pico
     mes_pico = tx_por_mes.idxmax() if not tx_por_mes.empty else 'N/A'
@@ -301,6 +482,31 @@ def analizar_estacionalidad(df_cliente: pd.DataFrame) -> Dict:
     return estacionalidad
 
 
+def analizar_cliente_completo(df_cliente: pd.DataFrame, umbral_std: float = 2.5) -> Dict:
+    """
+    Ejecuta métricas, anomalías, estacionalidad y score de consistencia
+    extrayendo MONTO y parseando FECHA una sola vez para los tres análisis
+    
+    Args:
+        df_cliente: DataFrame con transacciones del cliente
+        umbral_std: Número de desviaciones estándar para considerar anomalía
+        
+    Returns:
+        Dict con metricas_comportamiento, patrones_anomalos, estacionalidad y score_consistencia
+    """
+    datos = _empaquetar(df_cliente)
+    
+    metricas = calcular_metricas_comportamiento(df_cliente, _datos=datos)
+    anomalias = detectar_patrones_anomalos(df_cliente, umbral_std, _datos=datos)
+    
+    return {
+        'metricas_comportamiento': metricas,
+        'patrones_anomalos': anomalias,
+        'estacionalidad': analizar_estacionalidad(df_cliente, _datos=datos),
+        'score_consistencia': calcular_score_consistencia(metricas, anomalias)
+    }
+
+
 def calcular_score_consistencia(metricas: Dict, anomalias: Dict) -> Dict:
     """
     Calcula un score de consistencia comportamental
@@ -317,33 +523,24 @@ def calcular_score_consistencia(metricas: Dict, anomalias: Dict) -> Dict:
     
     # Penalizaciones por variabilidad
     cv = metricas.get('coeficiente_variacion', 0)
-    if cv > 150:
-        score -= 30
-        factores.append('Muy alta variabilidad en montos')
-    elif cv > 100:
-        score -= 20
-        factores.append('Alta variabilidad en montos')
-    elif cv > 50:
-        score -= 10
-        factores.append('Moderada variabilidad en montos')
+    i = bisect_left(_CV_UMBRALES, cv)
+    score -= _CV_PENALIZACIONES[i]
+    if _CV_FACTORES[i]:
+        factores.append(_CV_FACTORES[i])
     
     # Penalizaciones por anomalías
     total_anomalias = anomalias.get('total_anomalias', 0)
-    if total_anomalias >= 10:
-        score -= 25
-        factores.append(f'Múltiples anomalías detectadas ({total_anomalias})')
-    elif total_anomalias >= 5:
-        score -= 15
-        factores.append(f'Anomalías moderadas ({total_anomalias})')
+    i = bisect_right(_ANOMALIAS_UMBRALES, total_anomalias)
+    score -= _ANOMALIAS_PENALIZACIONES[i]
+    if _ANOMALIAS_FACTORES[i]:
+        factores.append(_ANOMALIAS_FACTORES[i].format(total_anomalias))
     
     # Penalizaciones por baja tasa de éxito
     tasa_exito = metricas.get('tasa_exito', 100)
-    if tasa_exito < 70:
-        score -= 20
-        factores.append(f'Baja tasa de éxito ({tasa_exito:.1f}%)')
-    elif tasa_exito < 85:
-        score -= 10
-        factores.append(f'Tasa de éxito moderada ({tasa_exito:.1f}%)')
+    i = bisect_right(_EXITO_UMBRALES, tasa_exito)
+    score -= _EXITO_PENALIZACIONES[i]
+    if _EXITO_FACTORES[i]:
+        factores.append(_EXITO_FACTORES[i].format(tasa_exito))
     
     # Bonificaciones por estabilidad
     if metricas.get('indice_consistencia', 0) >= 90:
@@ -352,18 +549,7 @@ def calcular_score_consistencia(metricas: Dict, anomalias: Dict) -> Dict:
     
     score = max(0, min(score, 100))
     
-    if score >= 80:
-        clasificacion = 'Excelente'
-        color = '🟢'
-    elif score >= 60:
-        clasificacion = 'Bueno'
-        color = '🟡'
-    elif score >= 40:
-        clasificacion = 'Regular'
-        color = '🟠'
-    else:
-        clasificacion = 'Deficiente'
-        color = '🔴'
+    clasificacion, color = _CLASIFICACIONES[bisect_right(_CLASIFICACION_UMBRALES, score)]
     
     return {
         'score': score,
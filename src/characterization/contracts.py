@@ -97,6 +97,7 @@ class MetricasComportamiento(TypedDict, total=False):
     coeficiente_variacion: float
     monto_minimo: float
     monto_maximo: float
+    monto_p95: float
     rango: float
     
     # Temporales
@@ -403,6 +404,7 @@ FUNCIONES PRINCIPALES Y SUS CONTRATOS:
 5. detectar_patrones_anomalos(df_cliente, umbral_std) -> PatronesAnomalos
 6. analizar_estacionalidad(df_cliente) -> Estacionalidad
 7. calcular_score_consistencia(metricas, anomalias) -> ScoreConsistencia
+   analizar_cliente_completo(df_cliente, umbral_std) -> Dict con 4-7 (FECHA parseada una vez)
 8. evaluar_banderas_riesgo(df_cliente) -> EvaluacionBanderas
 9. calcular_score_riesgo(evaluacion) -> int
 
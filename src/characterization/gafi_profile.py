@@ -9,9 +9,63 @@ Implementa clasificación de riesgo basada en:
 - Comportamiento histórico
 """
 
+import operator
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
+from .base_characterization import _NS_DIA, _mascara_rechazo
+
+# Factores GAFI: (métrica, comparación, umbral, puntos, descripción). Única fuente
+# de las reglas para _score_perfil() (por cliente) y generar_reporte_gafi() (cartera)
+_FACTORES_GAFI = (
+    ('volumen_total', operator.gt, 100_000_000, 20, "Volumen alto: ${:,.0f}"),
+    ('promedio_tx', operator.gt, 10_000_000, 15, "Monto promedio alto: ${:,.0f}"),
+    ('frecuencia_diaria', operator.gt, 10, 15, "Alta frecuencia: {:.1f} TX/día"),
+    ('tipos_unicos', operator.ge, 3, 10, "Diversidad de TX: {} tipos"),
+    ('tasa_rechazo', operator.gt, 15, 20, "Alta tasa de rechazo: {:.1f}%"),
+    ('proporcion_juridicas', operator.gt, 50, 10, "Alta proporción jurídicas: {:.1f}%"),
+)
+_PUNTOS_FACTORES = np.array([puntos for _, _, _, puntos, _ in _FACTORES_GAFI], dtype=np.int64)
+
+# Niveles GAFI por score: (score mínimo, nivel, perfil), de mayor a menor
+_NIVELES_GAFI = (
+    (60, 'Alto', 'Cliente de Alto Riesgo - Requiere Monitoreo Reforzado'),
+    (30, 'Medio', 'Cliente de Riesgo Medio - Monitoreo Estándar'),
+    (0, 'Bajo', 'Cliente de Bajo Riesgo - Monitoreo Normal'),
+)
+
+# Variación de score (puntos) entre ventanas que se considera cambio de tendencia
+VARIACION_TENDENCIA = 10
+
+
+def _score_perfil(
+    volumen_total: float,
+    promedio_tx: float,
+    frecuencia_diaria: float,
+    tipos_unicos: Optional[int],
+    tasa_rechazo: Optional[float],
+    proporcion_juridicas: Optional[float]
+) -> Tuple[int, List[str]]:
+    """
+    Suma los puntos de los seis factores GAFI a partir de métricas ya calculadas
+    
+    Args:
+        volumen_total, promedio_tx, frecuencia_diaria: Métricas base del cliente
+        tipos_unicos, tasa_rechazo, proporcion_juridicas: None si falta la columna
+        
+    Returns:
+        (score sin tope, factores de riesgo)
+    """
+    score = 0
+    factores_riesgo = []
+    
+    valores = (volumen_total, promedio_tx, frecuencia_diaria, tipos_unicos, tasa_rechazo, proporcion_juridicas)
+    for valor, (_, comparacion, umbral, puntos, descripcion) in zip(valores, _FACTORES_GAFI):
+        if valor is not None and comparacion(valor, umbral):
+            score += puntos
+            factores_riesgo.append(descripcion.format(valor))
+    
+    return score, factores_riesgo
 
 
 def clasificar_perfil_gafi(df_cliente: pd.DataFrame) -> Dict[str, any]:
@@ -46,58 +100,27 @@ def clasificar_perfil_gafi(df_cliente: pd.DataFrame) -> Dict[str, any]:
     else:
         frecuencia_diaria = 0
     
-    # Calcular score de riesgo (0-100)
-    score = 0
-    factores_riesgo = []
+    tipos_unicos = df_cliente['TIPO DE TRA'].nunique() if 'TIPO DE TRA' in df_cliente.columns else None
     
-    # Factor 1: Volumen alto (>$100M COP)
-    if volumen_total > 100_000_000:
-        score += 20
-        factores_riesgo.append(f"Volumen alto: ${volumen_total:,.0f}")
-    
-    # Factor 2: Transacciones promedio altas (>$10M COP)
-    if promedio_tx > 10_000_000:
-        score += 15
-        factores_riesgo.append(f"Monto promedio alto: ${promedio_tx:,.0f}")
-    
-    # Factor 3: Alta frecuencia (>10 TX/día)
-    if frecuencia_diaria > 10:
-        score += 15
-        factores_riesgo.append(f"Alta frecuencia: {frecuencia_diaria:.1f} TX/día")
-    
-    # Factor 4: Diversidad de tipos de transacción
-    if 'TIPO DE TRA' in df_cliente.columns:
-        tipos_unicos = df_cliente['TIPO DE TRA'].nunique()
-        if tipos_unicos >= 3:
-            score += 10
-            factores_riesgo.append(f"Diversidad de TX: {tipos_unicos} tipos")
-    
-    # Factor 5: Tasa de rechazo/retorno alta
+    tasa_rechazo = None
     if 'ESTADO' in df_cliente.columns:
-        tx_rechazadas = df_cliente['ESTADO'].str.lower().str.contains('rechazado|retornado', na=False).sum()
+        tx_rechazadas = _mascara_rechazo(df_cliente['ESTADO']).sum()
         tasa_rechazo = (tx_rechazadas / total_tx * 100) if total_tx > 0 else 0
-        if tasa_rechazo > 15:
-            score += 20
-            factores_riesgo.append(f"Alta tasa de rechazo: {tasa_rechazo:.1f}%")
     
-    # Factor 6: Transacciones con personas jurídicas
+    proporcion_juridicas = None
     if 'TIPO_PERSONA' in df_cliente.columns:
         tx_juridicas = (df_cliente['TIPO_PERSONA'] == 'Jurídica').sum()
         proporcion_juridicas = (tx_juridicas / total_tx * 100) if total_tx > 0 else 0
-        if proporcion_juridicas > 50:
-            score += 10
-            factores_riesgo.append(f"Alta proporción jurídicas: {proporcion_juridicas:.1f}%")
-    
-    # Determinar nivel de riesgo
-    if score >= 60:
-        nivel_riesgo = 'Alto'
-        perfil = 'Cliente de Alto Riesgo - Requiere Monitoreo Reforzado'
-    elif score >= 30:
-        nivel_riesgo = 'Medio'
-        perfil = 'Cliente de Riesgo Medio - Monitoreo Estándar'
-    else:
-        nivel_riesgo = 'Bajo'
-        perfil = 'Cliente de Bajo Riesgo - Monitoreo Normal'
+    
+    # Calcular score de riesgo (0-100)
+    score, factores_riesgo = _score_perfil(
+        volumen_total, promedio_tx, frecuencia_diaria, tipos_unicos, tasa_rechazo, proporcion_juridicas
+    )
+    
+    # Determinar nivel de riesgo (primer tramo de _NIVELES_GAFI que alcanza el score)
+    nivel_riesgo, perfil = next(
+        (nivel, perfil) for minimo, nivel, perfil in _NIVELES_GAFI if score >= minimo
+    )
     
     return {
         'perfil': perfil,
@@ -165,6 +188,64 @@ def obtener_recomendaciones_gafi(perfil_riesgo: Dict) -> List[str]:
     return recomendaciones
 
 
+def _metricas_gafi_por_cliente(df_completo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calcula, para todos los clientes en una sola agrupación, las métricas
+    que usa clasificar_perfil_gafi()
+    
+    Args:
+        df_completo: DataFrame con todas las transacciones (columna CLIENTE)
+        
+    Returns:
+        DataFrame indexado por CLIENTE con las mismas reglas que clasificar_perfil_gafi()
+    """
+    columnas = {'CLIENTE': df_completo['CLIENTE'].array}
+    agregaciones = {}
+    
+    if 'MONTO (COP)' in df_completo.columns:
+        columnas['monto'] = df_completo['MONTO (COP)'].array
+        agregaciones['volumen_total'] = ('monto', 'sum')
+        agregaciones['promedio_tx'] = ('monto', 'mean')
+    
+    if 'FECHA' in df_completo.columns:
+        columnas['fecha'] = df_completo['FECHA'].array
+        agregaciones['fecha_min'] = ('fecha', 'min')
+        agregaciones['fecha_max'] = ('fecha', 'max')
+    
+    if 'TIPO DE TRA' in df_completo.columns:
+        columnas['tipo'] = df_completo['TIPO DE TRA'].array
+        agregaciones['tipos_unicos'] = ('tipo', 'nunique')
+    
+    if 'ESTADO' in df_completo.columns:
+        # Máscara de rechazo calculada una vez para toda la cartera
+        columnas['rechazo'] = _mascara_rechazo(df_completo['ESTADO'])
+        agregaciones['rechazos'] = ('rechazo', 'sum')
+    
+    if 'TIPO_PERSONA' in df_completo.columns:
+        columnas['juridica'] = (df_completo['TIPO_PERSONA'] == 'Jurídica').to_numpy()
+        agregaciones['juridicas'] = ('juridica', 'sum')
+    
+    grupos = pd.DataFrame(columnas).groupby('CLIENTE', sort=False, observed=True)
+    total_tx = grupos.size()
+    agregado = grupos.agg(**agregaciones) if agregaciones else pd.DataFrame(index=total_tx.index)
+    
+    metricas = pd.DataFrame({'total_transacciones': total_tx})
+    metricas['volumen_total'] = agregado['volumen_total'] if 'volumen_total' in agregado else 0
+    metricas['promedio_tx'] = agregado['promedio_tx'] if 'promedio_tx' in agregado else 0
+    
+    # Sin fechas válidas el período cuenta como 1 día (igual que clasificar_perfil_gafi)
+    metricas['frecuencia_diaria'] = 0
+    if 'fecha_min' in agregado:
+        dias_activo = (agregado['fecha_max'] - agregado['fecha_min']).dt.days.fillna(1)
+        metricas['frecuencia_diaria'] = total_tx / dias_activo.clip(lower=1)
+    
+    metricas['tipos_unicos'] = agregado['tipos_unicos'] if 'tipos_unicos' in agregado else 0
+    metricas['tasa_rechazo'] = agregado['rechazos'] / total_tx * 100 if 'rechazos' in agregado else 0
+    metricas['proporcion_juridicas'] = agregado['juridicas'] / total_tx * 100 if 'juridicas' in agregado else 0
+    
+    return metricas
+
+
 def generar_reporte_gafi(df_completo: pd.DataFrame, clientes: List[str]) -> pd.DataFrame:
     """
     Genera reporte consolidado de perfiles GAFI para todos los clientes
@@ -176,24 +257,38 @@ def generar_reporte_gafi(df_completo: pd.DataFrame, clientes: List[str]) -> pd.D
     Returns:
         DataFrame con resumen de perfiles GAFI
     """
-    reportes = []
+    # Métricas de toda la cartera en una sola pasada (sin filtrar el DataFrame por cliente)
+    metricas = _metricas_gafi_por_cliente(df_completo).reindex(list(clientes))
     
-    for cliente in clientes:
-        df_cliente = df_completo[df_completo['CLIENTE'] == cliente]
-        perfil = clasificar_perfil_gafi(df_cliente)
-        
-        reportes.append({
-            'Cliente': cliente,
-            'Nivel_Riesgo': perfil['nivel_riesgo'],
-            'Score': perfil['score'],
-            'Perfil': perfil['perfil'],
-            'Total_TX': perfil['metricas']['total_transacciones'],
-            'Volumen': perfil['metricas']['volumen_total'],
-            'Promedio_TX': perfil['metricas']['promedio_transaccion'],
-            'Factores_Riesgo': len(perfil['factores'])
-        })
-    
-    df_reporte = pd.DataFrame(reportes)
+    # Clientes sin transacciones: perfil 'Sin Datos' como en clasificar_perfil_gafi()
+    sin_datos = metricas['total_transacciones'].isna().to_numpy()
+    metricas = metricas.fillna({'total_transacciones': 0, 'volumen_total': 0, 'promedio_tx': 0}) if sin_datos.any() else metricas
+    
+    # Mismos factores que clasificar_perfil_gafi(): matriz (clientes x 6) de factores
+    # activos; el score es su producto con los puntos de cada factor
+    activos = np.column_stack([
+        comparacion(metricas[metrica].to_numpy(), umbral)
+        for metrica, comparacion, umbral, _, _ in _FACTORES_GAFI
+    ])
+    score = activos @ _PUNTOS_FACTORES
+    total_factores = activos.sum(axis=1)
+    
+    # El último tramo de _NIVELES_GAFI (score >= 0) queda como valor por defecto
+    tramos = [sin_datos] + [score >= minimo for minimo, _, _ in _NIVELES_GAFI[:-1]]
+    _, nivel_base, perfil_base = _NIVELES_GAFI[-1]
+    nivel_riesgo = np.select(tramos, ['N/A'] + [nivel for _, nivel, _ in _NIVELES_GAFI[:-1]], nivel_base)
+    perfil = np.select(tramos, ['Sin Datos'] + [perfil for _, _, perfil in _NIVELES_GAFI[:-1]], perfil_base)
+    
+    df_reporte = pd.DataFrame({
+        'Cliente': list(clientes),
+        'Nivel_Riesgo': nivel_riesgo.astype(object),
+        'Score': np.minimum(score, 100),
+        'Perfil': perfil.astype(object),
+        'Total_TX': metricas['total_transacciones'].to_numpy(dtype=np.int64),
+        'Volumen': metricas['volumen_total'].to_numpy(),
+        'Promedio_TX': metricas['promedio_tx'].to_numpy(),
+        'Factores_Riesgo': total_factores
+    })
     
     # Ordenar por score descendente
     df_reporte = df_reporte.sort_values('Score', ascending=False)
@@ -215,32 +310,62 @@ def calcular_tendencia_riesgo(df_cliente: pd.DataFrame, ventana_dias: int = 30)
     if 'FECHA' not in df_cliente.columns or df_cliente.empty:
         return {'tendencia': 'Sin datos', 'variacion': 0}
     
-    df_sorted = df_cliente.sort_values('FECHA')
-    fecha_max = df_sorted['FECHA'].max()
-    fecha_limite = fecha_max - pd.Timedelta(days=ventana_dias)
+    # FECHA como marcas int64 ordenadas una vez; las dos ventanas son tramos
+    # contiguos que se ubican con searchsorted (NaT queda fuera de ambas)
+    fechas = df_cliente['FECHA'].to_numpy(dtype='datetime64[ns]')
+    validas = np.flatnonzero(~np.isnat(fechas))
+    if validas.size == 0:
+        return {'tendencia': 'Insuficientes datos', 'variacion': 0}
     
-    # Período reciente
-    df_reciente = df_sorted[df_sorted['FECHA'] > fecha_limite]
+    orden = validas[np.argsort(fechas[validas], kind='stable')]
+    ns = fechas[orden].view(np.int64)
+    ventana_ns = ventana_dias * _NS_DIA
+    fecha_limite = ns[-1] - ventana_ns
+    fecha_anterior = fecha_limite - ventana_ns
     
-    # Período anterior
-    fecha_anterior = fecha_limite - pd.Timedelta(days=ventana_dias)
-    df_anterior = df_sorted[(df_sorted['FECHA'] > fecha_anterior) & (df_sorted['FECHA'] <= fecha_limite)]
+    # Período reciente: FECHA > fecha_limite; período anterior: (fecha_anterior, fecha_limite]
+    corte_reciente = np.searchsorted(ns, fecha_limite, side='right')
+    corte_anterior = np.searchsorted(ns, fecha_anterior, side='right')
     
-    if df_anterior.empty or df_reciente.empty:
+    if corte_reciente == ns.size or corte_anterior == corte_reciente:
         return {'tendencia': 'Insuficientes datos', 'variacion': 0}
     
-    # Calcular scores
-    perfil_reciente = clasificar_perfil_gafi(df_reciente)
-    perfil_anterior = clasificar_perfil_gafi(df_anterior)
+    # Columnas del cliente en orden cronológico, preparadas una sola vez para ambas ventanas
+    montos = df_cliente['MONTO (COP)'].to_numpy()[orden] if 'MONTO (COP)' in df_cliente.columns else None
+    tipos = pd.factorize(df_cliente['TIPO DE TRA'])[0][orden] if 'TIPO DE TRA' in df_cliente.columns else None
+    rechazos = _mascara_rechazo(df_cliente['ESTADO'])[orden] if 'ESTADO' in df_cliente.columns else None
+    juridicas = (df_cliente['TIPO_PERSONA'] == 'Jurídica').to_numpy()[orden] if 'TIPO_PERSONA' in df_cliente.columns else None
+    
+    def score_ventana(inicio: int, fin: int) -> int:
+        """Score de clasificar_perfil_gafi() para las filas ordenadas [inicio, fin)"""
+        total_tx = fin - inicio
+        volumen_total, promedio_tx = 0, 0
+        if montos is not None:
+            tramo = pd.Series(montos[inicio:fin])
+            volumen_total, promedio_tx = tramo.sum(), tramo.mean()
+        dias_activo = (ns[fin - 1] - ns[inicio]) // _NS_DIA
+        frecuencia_diaria = total_tx / max(dias_activo, 1)
+        tipos_unicos = None
+        if tipos is not None:
+            codigos = tipos[inicio:fin]
+            tipos_unicos = np.unique(codigos[codigos >= 0]).size
+        tasa_rechazo = rechazos[inicio:fin].sum() / total_tx * 100 if rechazos is not None else None
+        proporcion_juridicas = juridicas[inicio:fin].sum() / total_tx * 100 if juridicas is not None else None
+        
+        score, _ = _score_perfil(
+            volumen_total, promedio_tx, frecuencia_diaria, tipos_unicos, tasa_rechazo, proporcion_juridicas
+        )
+        return min(score, 100)
     
-    score_reciente = perfil_reciente['score']
-    score_anterior = perfil_anterior['score']
+    # Calcular scores
+    score_reciente = score_ventana(corte_reciente, ns.size)
+    score_anterior = score_ventana(corte_anterior, corte_reciente)
     
     variacion = score_reciente - score_anterior
     
-    if variacion > 10:
+    if variacion > VARIACION_TENDENCIA:
         tendencia = 'Incremento de riesgo'
-    elif variacion < -10:
+    elif variacion < -VARIACION_TENDENCIA:
         tendencia = 'Disminución de riesgo'
     else:
         tendencia = 'Estable'
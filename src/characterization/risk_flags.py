@@ -10,8 +10,9 @@ Implementa detección de señales de alerta según:
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from .base_characterization import _mascara_rechazo
 
 
 # Umbrales de alerta (en COP)
@@ -20,6 +21,17 @@ UMBRAL_VOLUMEN_DIARIO_ALTO = 50_000_000  # $50M
 UMBRAL_VOLUMEN_MENSUAL_ALTO = 500_000_000  # $500M
 UMBRAL_FRECUENCIA_DIARIA_ALTA = 20  # 20 TX por día
 
+# Umbrales de los detectores (proporciones y porcentajes)
+FRAGMENTACION_FACTOR_INFERIOR = 0.8  # Monto similar: >= 80% de la media del día
+FRAGMENTACION_FACTOR_SUPERIOR = 1.2  # ... y <= 120%
+FRAGMENTACION_MIN_TX_SIMILARES = 5  # TX similares en un mismo día
+PROPORCION_MADRUGADA_ALTA = 0.2  # Más del 20% entre 00:00 y 06:00
+PROPORCION_FIN_SEMANA_ALTA = 0.4  # Más del 40% en sábado/domingo
+TASA_RECHAZO_ALTA = 20  # % de TX rechazadas/retornadas
+MIN_TX_CAMBIOS_COMPORTAMIENTO = 20  # TX mínimas para comparar mitades
+VARIACION_VOLUMEN_BRUSCA = 200  # % de cambio entre mitades
+VARIACION_FRECUENCIA_BRUSCA = 150  # % de cambio entre mitades
+
 
 def evaluar_banderas_riesgo(df_cliente: pd.DataFrame) -> Dict:
     """
@@ -41,23 +53,28 @@ def evaluar_banderas_riesgo(df_cliente: pd.DataFrame) -> Dict:
     
     banderas = []
     
+    # FECHA convertida y filtrada UNA vez; los agregados por día se comparten
+    # entre los detectores temporales
+    df_fechado = _filtrar_fechas_validas(df_cliente)
+    diarios = _agregados_diarios(df_fechado)
+    
     # 1. Transacciones de alto valor
     banderas.extend(_detectar_transacciones_alto_valor(df_cliente))
     
     # 2. Volumen inusual
-    banderas.extend(_detectar_volumen_inusual(df_cliente))
+    banderas.extend(_detectar_volumen_inusual(df_fechado, diarios))
     
     # 3. Fragmentación (Structuring/Smurfing)
-    banderas.extend(_detectar_fragmentacion(df_cliente))
+    banderas.extend(_detectar_fragmentacion(diarios))
     
     # 4. Actividad inusual temporal
-    banderas.extend(_detectar_patrones_temporales_sospechosos(df_cliente))
+    banderas.extend(_detectar_patrones_temporales_sospechosos(df_fechado, diarios))
     
     # 5. Alta tasa de rechazo
     banderas.extend(_detectar_alta_tasa_rechazo(df_cliente))
     
     # 6. Cambios bruscos en comportamiento
-    banderas.extend(_detectar_cambios_comportamiento(df_cliente))
+    banderas.extend(_detectar_cambios_comportamiento(df_fechado))
     
     # 7. Transacciones con jurisdicciones de alto riesgo (si aplica)
     banderas.extend(_detectar_transacciones_riesgosas(df_cliente))
@@ -90,6 +107,56 @@ def evaluar_banderas_riesgo(df_cliente: pd.DataFrame) -> Dict:
     }
 
 
+def _filtrar_fechas_validas(df_cliente: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Convierte FECHA una sola vez y conserva las filas con fecha válida
+    
+    Args:
+        df_cliente: DataFrame con transacciones del cliente
+        
+    Returns:
+        DataFrame con FECHA (datetime) y MONTO (COP) si existe; None sin columna FECHA
+    """
+    if 'FECHA' not in df_cliente.columns:
+        return None
+    
+    fechas = pd.to_datetime(df_cliente['FECHA'], errors='coerce')
+    validas = fechas.notna()
+    columnas = {'FECHA': fechas[validas]}
+    if 'MONTO (COP)' in df_cliente.columns:
+        columnas['MONTO (COP)'] = df_cliente['MONTO (COP)'][validas]
+    return pd.DataFrame(columnas)
+
+
+def _agregados_diarios(df_fechado: Optional[pd.DataFrame]) -> Optional[Dict]:
+    """
+    Agrupa por día calendario UNA vez para los detectores temporales
+    
+    Args:
+        df_fechado: Resultado de _filtrar_fechas_validas()
+        
+    Returns:
+        Dict con 'cantidad' por día y, si hay MONTO, 'volumen' y 'media' por día más
+        'montos' y 'codigo' (posición del día de cada fila); None sin fechas válidas
+    """
+    if df_fechado is None or df_fechado.empty:
+        return None
+    
+    dia = df_fechado['FECHA'].dt.date
+    if 'MONTO (COP)' not in df_fechado.columns:
+        return {'cantidad': dia.groupby(dia).size()}
+    
+    montos = df_fechado['MONTO (COP)']
+    por_dia = montos.groupby(dia)
+    return {
+        'cantidad': por_dia.size(),
+        'volumen': por_dia.sum(),
+        'media': por_dia.mean(),
+        'montos': montos,
+        'codigo': por_dia.ngroup().to_numpy()
+    }
+
+
 def _detectar_transacciones_alto_valor(df_cliente: pd.DataFrame) -> List[Dict]:
     """Detecta transacciones individuales de alto valor"""
     banderas = []
@@ -97,12 +164,13 @@ def _detectar_transacciones_alto_valor(df_cliente: pd.DataFrame) -> List[Dict]:
     if 'MONTO (COP)' not in df_cliente.columns:
         return banderas
     
-    df_alto_valor = df_cliente[df_cliente['MONTO (COP)'] >= UMBRAL_TRANSACCION_ALTA]
+    montos = df_cliente['MONTO (COP)']
+    montos_altos = montos[montos >= UMBRAL_TRANSACCION_ALTA]
     
-    if not df_alto_valor.empty:
-        cantidad = len(df_alto_valor)
-        monto_total = df_alto_valor['MONTO (COP)'].sum()
-        monto_max = df_alto_valor['MONTO (COP)'].max()
+    if not montos_altos.empty:
+        cantidad = len(montos_altos)
+        monto_total = montos_altos.sum()
+        monto_max = montos_altos.max()
         
         banderas.append({
             'tipo': 'Transacciones de Alto Valor',
@@ -120,23 +188,15 @@ def _detectar_transacciones_alto_valor(df_cliente: pd.DataFrame) -> List[Dict]:
     return banderas
 
 
-def _detectar_volumen_inusual(df_cliente: pd.DataFrame) -> List[Dict]:
+def _detectar_volumen_inusual(df_fechado: Optional[pd.DataFrame], diarios: Optional[Dict]) -> List[Dict]:
     """Detecta volúmenes transaccionales inusuales"""
     banderas = []
     
-    if 'MONTO (COP)' not in df_cliente.columns or 'FECHA' not in df_cliente.columns:
-        return banderas
-    
-    df_temp = df_cliente.copy()
-    df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-    df_temp = df_temp.dropna(subset=['FECHA'])
-    
-    if df_temp.empty:
+    if diarios is None or 'volumen' not in diarios:
         return banderas
     
     # Volumen diario
-    df_temp['fecha_simple'] = df_temp['FECHA'].dt.date
-    volumen_diario = df_temp.groupby('fecha_simple')['MONTO (COP)'].sum()
+    volumen_diario = diarios['volumen']
     
     dias_alto_volumen = volumen_diario[volumen_diario >= UMBRAL_VOLUMEN_DIARIO_ALTO]
     
@@ -154,9 +214,10 @@ def _detectar_volumen_inusual(df_cliente: pd.DataFrame) -> List[Dict]:
             'puntos': 20
         })
     
-    # Volumen mensual
-    df_temp['mes'] = df_temp['FECHA'].dt.to_period('M')
-    volumen_mensual = df_temp.groupby('mes')['MONTO (COP)'].sum()
+    # Volumen mensual (clave entera año*12+mes en lugar de un PeriodIndex)
+    fechas = df_fechado['FECHA'].dt
+    mes = fechas.year.to_numpy() * 12 + fechas.month.to_numpy()
+    volumen_mensual = df_fechado['MONTO (COP)'].groupby(mes).sum()
     
     meses_alto_volumen = volumen_mensual[volumen_mensual >= UMBRAL_VOLUMEN_MENSUAL_ALTO]
     
@@ -176,67 +237,58 @@ def _detectar_volumen_inusual(df_cliente: pd.DataFrame) -> List[Dict]:
     return banderas
 
 
-def _detectar_fragmentacion(df_cliente: pd.DataFrame) -> List[Dict]:
+def _detectar_fragmentacion(diarios: Optional[Dict]) -> List[Dict]:
     """Detecta posible fragmentación de transacciones (Structuring)"""
     banderas = []
     
-    if 'MONTO (COP)' not in df_cliente.columns or 'FECHA' not in df_cliente.columns:
+    if diarios is None or 'montos' not in diarios:
         return banderas
     
-    df_temp = df_cliente.copy()
-    df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-    df_temp = df_temp.dropna(subset=['FECHA'])
-    
-    if df_temp.empty:
-        return banderas
-    
-    # Detectar múltiples transacciones en el mismo día con montos similares
-    df_temp['fecha_simple'] = df_temp['FECHA'].dt.date
-    
-    for fecha, grupo in df_temp.groupby('fecha_simple'):
-        if len(grupo) >= 5:  # 5 o más TX en un día
-            montos = grupo['MONTO (COP)']
-            
-            # Verificar si los montos son similares (±20%)
-            media_monto = montos.mean()
-            montos_similares = montos[(montos >= media_monto * 0.8) & (montos <= media_monto * 1.2)]
-            
-            if len(montos_similares) >= 5:
-                banderas.append({
-                    'tipo': 'Posible Fragmentación (Structuring)',
-                    'severidad': 'Alta',
-                    'descripcion': f'{len(montos_similares)} TX con montos similares en {fecha}',
-                    'detalles': {
-                        'fecha': str(fecha),
-                        'cantidad_tx': len(montos_similares),
-                        'monto_promedio': media_monto,
-                        'monto_total_dia': montos.sum()
-                    },
-                    'recomendacion': 'Investigar motivo de fragmentación - Posible evasión de controles',
-                    'puntos': 30
-                })
-                break  # Solo reportar una vez
+    # Detectar múltiples transacciones en el mismo día con montos similares:
+    # media de cada día difundida a sus filas y máscara ±20% en una sola pasada
+    montos = diarios['montos']
+    codigo = diarios['codigo']
+    valores = montos.to_numpy(dtype=np.float64, na_value=np.nan)
+    media_dia = diarios['media'].to_numpy(dtype=np.float64)[codigo]
+    similares = (valores >= media_dia * FRAGMENTACION_FACTOR_INFERIOR) & (valores <= media_dia * FRAGMENTACION_FACTOR_SUPERIOR)
+    similares_por_dia = np.bincount(codigo[similares], minlength=len(diarios['media']))
+    
+    # 5 o más TX similares en un día; se reporta solo el primer día (orden cronológico)
+    dias_fragmentados = np.flatnonzero(similares_por_dia >= FRAGMENTACION_MIN_TX_SIMILARES)
+    if dias_fragmentados.size > 0:
+        posicion = dias_fragmentados[0]
+        fecha = diarios['media'].index[posicion]
+        cantidad_similares = int(similares_por_dia[posicion])
+        montos_dia = montos[codigo == posicion]
+        banderas.append({
+            'tipo': 'Posible Fragmentación (Structuring)',
+            'severidad': 'Alta',
+            'descripcion': f'{cantidad_similares} TX con montos similares en {fecha}',
+            'detalles': {
+                'fecha': str(fecha),
+                'cantidad_tx': cantidad_similares,
+                'monto_promedio': montos_dia.mean(),
+                'monto_total_dia': montos_dia.sum()
+            },
+            'recomendacion': 'Investigar motivo de fragmentación - Posible evasión de controles',
+            'puntos': 30
+        })
     
     return banderas
 
 
-def _detectar_patrones_temporales_sospechosos(df_cliente: pd.DataFrame) -> List[Dict]:
+def _detectar_patrones_temporales_sospechosos(df_fechado: Optional[pd.DataFrame], diarios: Optional[Dict]) -> List[Dict]:
     """Detecta patrones temporales sospechosos"""
     banderas = []
     
-    if 'FECHA' not in df_cliente.columns:
+    if diarios is None:
         return banderas
     
-    df_temp = df_cliente.copy()
-    df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-    df_temp = df_temp.dropna(subset=['FECHA'])
-    
-    if df_temp.empty:
-        return banderas
+    fechas = df_fechado['FECHA']
+    total_tx = len(fechas)
     
     # 1. Frecuencia diaria muy alta
-    df_temp['fecha_simple'] = df_temp['FECHA'].dt.date
-    tx_por_dia = df_temp.groupby('fecha_simple').size()
+    tx_por_dia = diarios['cantidad']
     
     dias_alta_frecuencia = tx_por_dia[tx_por_dia >= UMBRAL_FRECUENCIA_DIARIA_ALTA]
     
@@ -254,35 +306,34 @@ def _detectar_patrones_temporales_sospechosos(df_cliente: pd.DataFrame) -> List[
         })
     
     # 2. Transacciones en horarios inusuales
-    if df_temp['FECHA'].dt.time.notna().any():
-        df_temp['hora'] = df_temp['FECHA'].dt.hour
-        tx_madrugada = df_temp[(df_temp['hora'] >= 0) & (df_temp['hora'] < 6)]
+    if fechas.dt.time.notna().any():
+        horas = fechas.dt.hour
+        tx_madrugada = int(((horas >= 0) & (horas < 6)).sum())
         
-        if len(tx_madrugada) > len(df_temp) * 0.2:  # Más del 20% en madrugada
+        if tx_madrugada > total_tx * PROPORCION_MADRUGADA_ALTA:
             banderas.append({
                 'tipo': 'Transacciones en Horario Inusual',
                 'severidad': 'Baja',
-                'descripcion': f'{len(tx_madrugada)} TX entre 00:00 y 06:00',
+                'descripcion': f'{tx_madrugada} TX entre 00:00 y 06:00',
                 'detalles': {
-                    'cantidad': len(tx_madrugada),
-                    'porcentaje': (len(tx_madrugada) / len(df_temp) * 100)
+                    'cantidad': tx_madrugada,
+                    'porcentaje': (tx_madrugada / total_tx * 100)
                 },
                 'recomendacion': 'Validar motivo de operaciones nocturnas',
                 'puntos': 10
             })
     
     # 3. Actividad concentrada en fin de semana
-    df_temp['dia_semana'] = df_temp['FECHA'].dt.dayofweek
-    tx_fin_semana = df_temp[df_temp['dia_semana'].isin([5, 6])]  # Sábado y Domingo
+    tx_fin_semana = int(fechas.dt.dayofweek.isin([5, 6]).sum())  # Sábado y Domingo
     
-    if len(tx_fin_semana) > len(df_temp) * 0.4:  # Más del 40% en fin de semana
+    if tx_fin_semana > total_tx * PROPORCION_FIN_SEMANA_ALTA:
         banderas.append({
             'tipo': 'Alta Actividad en Fin de Semana',
             'severidad': 'Baja',
-            'descripcion': f'{len(tx_fin_semana)} TX en sábado/domingo',
+            'descripcion': f'{tx_fin_semana} TX en sábado/domingo',
             'detalles': {
-                'cantidad': len(tx_fin_semana),
-                'porcentaje': (len(tx_fin_semana) / len(df_temp) * 100)
+                'cantidad': tx_fin_semana,
+                'porcentaje': (tx_fin_semana / total_tx * 100)
             },
             'recomendacion': 'Verificar tipo de negocio y justificación',
             'puntos': 8
@@ -299,12 +350,12 @@ def _detectar_alta_tasa_rechazo(df_cliente: pd.DataFrame) -> List[Dict]:
         return banderas
     
     total_tx = len(df_cliente)
-    tx_rechazadas = df_cliente['ESTADO'].str.lower().str.contains('rechazado|retornado', na=False).sum()
+    tx_rechazadas = _mascara_rechazo(df_cliente['ESTADO']).sum()
     
     if total_tx > 0:
         tasa_rechazo = (tx_rechazadas / total_tx * 100)
         
-        if tasa_rechazo >= 20:
+        if tasa_rechazo >= TASA_RECHAZO_ALTA:
             banderas.append({
                 'tipo': 'Alta Tasa de Rechazo',
                 'severidad': 'Media',
@@ -321,36 +372,32 @@ def _detectar_alta_tasa_rechazo(df_cliente: pd.DataFrame) -> List[Dict]:
     return banderas
 
 
-def _detectar_cambios_comportamiento(df_cliente: pd.DataFrame) -> List[Dict]:
+def _detectar_cambios_comportamiento(df_fechado: Optional[pd.DataFrame]) -> List[Dict]:
     """Detecta cambios bruscos en el comportamiento transaccional"""
     banderas = []
     
-    if 'FECHA' not in df_cliente.columns or 'MONTO (COP)' not in df_cliente.columns:
+    if df_fechado is None or 'MONTO (COP)' not in df_fechado.columns:
         return banderas
     
-    df_temp = df_cliente.copy()
-    df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-    df_temp = df_temp.dropna(subset=['FECHA'])
-    
-    if df_temp.empty or len(df_temp) < 20:  # Necesitamos suficientes datos
+    if df_fechado.empty or len(df_fechado) < MIN_TX_CAMBIOS_COMPORTAMIENTO:  # Necesitamos suficientes datos
         return banderas
     
-    # Ordenar por fecha
-    df_temp = df_temp.sort_values('FECHA')
+    # Ordenar por fecha solo la columna de montos (sin reordenar todo el DataFrame)
+    montos = df_fechado['MONTO (COP)'].iloc[df_fechado['FECHA'].argsort().to_numpy()]
     
     # Dividir en dos mitades
-    mitad = len(df_temp) // 2
-    df_primera_mitad = df_temp.iloc[:mitad]
-    df_segunda_mitad = df_temp.iloc[mitad:]
+    mitad = len(montos) // 2
+    montos_primera_mitad = montos.iloc[:mitad]
+    montos_segunda_mitad = montos.iloc[mitad:]
     
     # Comparar volúmenes
-    vol_primera = df_primera_mitad['MONTO (COP)'].sum()
-    vol_segunda = df_segunda_mitad['MONTO (COP)'].sum()
+    vol_primera = montos_primera_mitad.sum()
+    vol_segunda = montos_segunda_mitad.sum()
     
     if vol_primera > 0:
         variacion = ((vol_segunda - vol_primera) / vol_primera * 100)
         
-        if abs(variacion) >= 200:  # Cambio >= 200%
+        if abs(variacion) >= VARIACION_VOLUMEN_BRUSCA:
             banderas.append({
                 'tipo': 'Cambio Brusco en Volumen',
                 'severidad': 'Alta',
@@ -365,13 +412,13 @@ def _detectar_cambios_comportamiento(df_cliente: pd.DataFrame) -> List[Dict]:
             })
     
     # Comparar frecuencias
-    freq_primera = len(df_primera_mitad)
-    freq_segunda = len(df_segunda_mitad)
+    freq_primera = len(montos_primera_mitad)
+    freq_segunda = len(montos_segunda_mitad)
     
     if freq_primera > 0:
         variacion_freq = ((freq_segunda - freq_primera) / freq_primera * 100)
         
-        if abs(variacion_freq) >= 150:  # Cambio >= 150%
+        if abs(variacion_freq) >= VARIACION_FRECUENCIA_BRUSCA:
             banderas.append({
                 'tipo': 'Cambio Brusco en Frecuencia',
                 'severidad': 'Media',
@@ -404,15 +451,15 @@ def _detectar_inconsistencias(df_cliente: pd.DataFrame) -> List[Dict]:
     
     # Verificar montos en cero o negativos
     if 'MONTO (COP)' in df_cliente.columns:
-        montos_invalidos = df_cliente[df_cliente['MONTO (COP)'] <= 0]
+        montos_invalidos = int((df_cliente['MONTO (COP)'] <= 0).sum())
         
-        if not montos_invalidos.empty:
+        if montos_invalidos:
             banderas.append({
                 'tipo': 'Datos Inconsistentes',
                 'severidad': 'Baja',
-                'descripcion': f'{len(montos_invalidos)} TX con montos <= 0',
+                'descripcion': f'{montos_invalidos} TX con montos <= 0',
                 'detalles': {
-                    'cantidad': len(montos_invalidos)
+                    'cantidad': montos_invalidos
                 },
                 'recomendacion': 'Revisar calidad de datos',
                 'puntos': 5
@@ -449,25 +496,51 @@ def generar_reporte_banderas(df_completo: pd.DataFrame, clientes: List[str]) ->
         clientes: Lista de clientes
         
     Returns:
-        DataFrame con resumen de banderas por cliente
+        DataFrame con resumen de banderas por cliente (columnas Requiere_* booleanas)
     """
-    reportes = []
-    
-    for cliente in clientes:
-        df_cliente = df_completo[df_completo['CLIENTE'] == cliente]
+    # FECHA se convierte UNA vez para toda la cartera: los detectores reciben la
+    # columna ya en datetime y su to_datetime por cliente no vuelve a parsear
+    if 'FECHA' in df_completo.columns and df_completo['FECHA'].dtype.kind != 'M':
+        df_completo = df_completo.assign(FECHA=pd.to_datetime(df_completo['FECHA'], errors='coerce'))
+    
+    # Una sola agrupación en lugar de una máscara CLIENTE == cliente por cliente
+    grupos = dict(iter(df_completo.groupby('CLIENTE', sort=False, observed=True)))
+    
+    # Columnas preasignadas; los clientes sin transacciones conservan los valores
+    # por defecto ('Sin datos', ceros y False) sin pasar por los detectores
+    clientes = list(clientes)
+    total_clientes = len(clientes)
+    total_banderas = np.zeros(total_clientes, dtype=np.int64)
+    nivel_alerta = np.full(total_clientes, 'Sin datos', dtype=object)
+    score_riesgo = np.zeros(total_clientes, dtype=np.int64)
+    requiere_uiaf = np.zeros(total_clientes, dtype=bool)
+    requiere_investigacion = np.zeros(total_clientes, dtype=bool)
+    banderas_criticas = np.zeros(total_clientes, dtype=np.int64)
+    
+    for i, cliente in enumerate(clientes):
+        df_cliente = grupos.get(cliente)
+        if df_cliente is None:
+            continue
+        
         evaluacion = evaluar_banderas_riesgo(df_cliente)
         
-        reportes.append({
-            'Cliente': cliente,
-            'Total_Banderas': evaluacion['total_banderas'],
-            'Nivel_Alerta': evaluacion['nivel_alerta'],
-            'Score_Riesgo': evaluacion['score_riesgo'],
-            'Requiere_UIAF': 'Sí' if evaluacion['requiere_reporte_uiaf'] else 'No',
-            'Requiere_Investigacion': 'Sí' if evaluacion['requiere_investigacion'] else 'No',
-            'Banderas_Criticas': sum(1 for b in evaluacion['banderas'] if b.get('severidad') == 'Alta')
-        })
-    
-    df_reporte = pd.DataFrame(reportes)
+        total_banderas[i] = evaluacion['total_banderas']
+        nivel_alerta[i] = evaluacion['nivel_alerta']
+        score_riesgo[i] = evaluacion['score_riesgo']
+        # Booleanos: el 'Sí'/'No' queda para la capa de presentación/exportación
+        requiere_uiaf[i] = evaluacion['requiere_reporte_uiaf']
+        requiere_investigacion[i] = evaluacion['requiere_investigacion']
+        banderas_criticas[i] = sum(1 for b in evaluacion['banderas'] if b.get('severidad') == 'Alta')
+    
+    df_reporte = pd.DataFrame({
+        'Cliente': clientes,
+        'Total_Banderas': total_banderas,
+        'Nivel_Alerta': nivel_alerta,
+        'Score_Riesgo': score_riesgo,
+        'Requiere_UIAF': requiere_uiaf,
+        'Requiere_Investigacion': requiere_investigacion,
+        'Banderas_Criticas': banderas_criticas
+    })
     df_reporte = df_reporte.sort_values('Score_Riesgo', ascending=False)
     
     return df_reporte
@@ -485,7 +558,9 @@ def priorizar_clientes_investigacion(df_reporte: pd.DataFrame, top_n: int = 10)
         DataFrame con clientes priorizados
     """
     # Filtrar solo clientes que requieren investigación
-    df_prioritarios = df_reporte[df_reporte['Requiere_Investigacion'] == 'Sí'].copy()
+    # Indexar con la columna bool directamente: una columna no bool (p. ej. 'Sí'/'No'
+    # de un export anterior) falla en vez de marcar a todos los clientes
+    df_prioritarios = df_reporte[df_reporte['Requiere_Investigacion']]
     
     # Ordenar por score y banderas críticas
     df_prioritarios = df_prioritarios.sort_values(
@@ -17,12 +17,14 @@ from .risk_engine import (
 from .risk_scoring import (
     calcular_score_integral,
     calcular_score_uiaf,
-    calcular_score_operativo
+    calcular_score_operativo,
+    calcular_scores_batch
 )
 from .risk_alerts import (
     generar_alertas_automaticas,
     priorizar_alertas,
-    clasificar_alerta
+    clasificar_alerta,
+    calcular_senales
 )
 from .risk_reports import (
     generar_reporte_riesgo,
@@ -40,10 +42,12 @@ __all__ = [
     'calcular_score_integral',
     'calcular_score_uiaf',
     'calcular_score_operativo',
+    'calcular_scores_batch',
     # Alertas
     'generar_alertas_automaticas',
     'priorizar_alertas',
     'clasificar_alerta',
+    'calcular_senales',
     # Reportes
     'generar_reporte_riesgo',
     'exportar_matriz_riesgo',
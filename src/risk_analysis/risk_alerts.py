@@ -3,20 +3,41 @@ Sistema de alertas de riesgo
 Genera y prioriza alertas automáticas
 """
 
+import numpy as np
 import pandas as pd
-import uuid
+from random import getrandbits
 from datetime import datetime
-from typing import List, Dict
-from .risk_contracts import AlertaRiesgo, TipoAlerta, PrioridadAlerta
+from typing import List, Dict, Optional
+from .risk_contracts import AlertaRiesgo, TipoAlerta, PrioridadAlerta, SenalesCliente
+from .risk_utils import _RE_RECHAZO, _mascara_rechazo
 
 
-def generar_alertas_automaticas(df_cliente: pd.DataFrame, scoring: Dict) -> List[AlertaRiesgo]:
+# Orden de atención de las alertas (prioridades desconocidas van al final)
+_ORDEN_PRIORIDAD = {'Crítica': 1, 'Alta': 2, 'Media': 3, 'Baja': 4}
+
+# Filas mínimas para que la alerta de fragmentación sea posible (3 días x 11 TX)
+_MIN_TX_FRAGMENTACION = 3 * 11
+
+
+def _id_alerta(prefijo: str) -> str:
+    """ID de alerta: prefijo + 8 dígitos hexadecimales aleatorios (sin construir un UUID)"""
+    return f"{prefijo}-{getrandbits(32):08X}"
+
+
+def generar_alertas_automaticas(
+    df_cliente: pd.DataFrame,
+    scoring: Dict,
+    fecha_deteccion: Optional[str] = None,
+    senales: Optional[SenalesCliente] = None
+) -> List[AlertaRiesgo]:
     """
     Genera alertas automáticas basadas en patrones detectados
     
     Args:
         df_cliente: DataFrame con transacciones
         scoring: Dict con scores calculados
+        fecha_deteccion: Timestamp ISO compartido por todas las alertas (por defecto, ahora)
+        senales: Señales de calcular_senales() ya calculadas (por defecto, se calculan)
     
     Returns:
         Lista de AlertaRiesgo
@@ -26,19 +47,27 @@ def generar_alertas_automaticas(df_cliente: pd.DataFrame, scoring: Dict) -> List
     if df_cliente.empty:
         return alertas
     
+    # Un único timestamp para todas las alertas del análisis
+    if fecha_deteccion is None:
+        fecha_deteccion = datetime.now().isoformat()
+    
+    # Señales del cliente calculadas una sola vez; las funciones de alerta solo formatean
+    if senales is None:
+        senales = calcular_senales(df_cliente)
+    
     # 1. Alertas de volumen alto
-    alertas.extend(_alertas_volumen(df_cliente))
+    alertas.extend(_alertas_volumen(senales, fecha_deteccion))
     
     # 2. Alertas UIAF
-    alertas.extend(_alertas_uiaf(df_cliente))
+    alertas.extend(_alertas_uiaf(senales, fecha_deteccion))
     
     # 3. Alertas operacionales
-    alertas.extend(_alertas_operacionales(df_cliente))
+    alertas.extend(_alertas_operacionales(senales, fecha_deteccion))
     
     # 4. Alertas por score crítico
     if scoring['score_total'] >= 76:
         alertas.append({
-            'id_alerta': f"SCORE-{uuid.uuid4().hex[:8].upper()}",
+            'id_alerta': _id_alerta("SCORE"),
             'tipo': 'Compliance',
             'prioridad': 'Crítica',
             'titulo': 'Score de riesgo crítico',
@@ -46,7 +75,7 @@ def generar_alertas_automaticas(df_cliente: pd.DataFrame, scoring: Dict) -> List
             'valor_detectado': float(scoring['score_total']),
             'umbral': 75.0,
             'accion_requerida': 'Suspender operaciones y realizar investigación inmediata',
-            'fecha_deteccion': datetime.now().isoformat(),
+            'fecha_deteccion': fecha_deteccion,
             'requiere_reporte_uiaf': True,
             'dias_para_accion': 1
         })
@@ -57,20 +86,80 @@ def generar_alertas_automaticas(df_cliente: pd.DataFrame, scoring: Dict) -> List
     return alertas_priorizadas
 
 
-def _alertas_volumen(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
+def calcular_senales(df_cliente: pd.DataFrame) -> SenalesCliente:
+    """
+    Calcula en una pasada las métricas que usan las alertas automáticas
+    
+    El motor calcula las señales una vez y las comparte entre
+    generar_alertas_automaticas() y la matriz de riesgo.
+    
+    Args:
+        df_cliente: DataFrame con transacciones
+    
+    Returns:
+        SenalesCliente (None en las métricas cuya columna falta)
+    """
+    columnas = df_cliente.columns
+    total_tx = len(df_cliente)
+    
+    senales = {
+        'total_tx': total_tx,
+        'monto_total': None,
+        'monto_promedio': None,
+        'dias_fragmentados': None,
+        'tasa_rechazo': None,
+        'diversidad_tipos': None
+    }
+    
+    if 'MONTO (COP)' in columnas:
+        montos = df_cliente['MONTO (COP)']
+        senales['monto_total'] = montos.sum()
+        senales['monto_promedio'] = montos.mean()
+        
+        # Fragmentación: días con muchas TX pequeñas que suman mucho. La alerta pide más
+        # de 2 días con más de 10 TX; con menos filas no hace falta agrupar por día
+        if 'FECHA' in columnas and total_tx < _MIN_TX_FRAGMENTACION:
+            senales['dias_fragmentados'] = 0
+        elif 'FECHA' in columnas:
+            fechas = df_cliente['FECHA']
+            if not pd.api.types.is_datetime64_any_dtype(fechas):
+                fechas = pd.to_datetime(fechas, errors='coerce')
+            if fechas.dt.tz is not None:
+                fechas = fechas.dt.tz_localize(None)  # Día según la hora local, como dt.date
+            # Conteo (montos no nulos) y suma por día con factorize + bincount,
+            # sin pasar por groupby
+            validas = fechas.notna().to_numpy()
+            codigos, dias = pd.factorize(fechas.to_numpy()[validas].astype('datetime64[D]'))
+            valores = montos.to_numpy(dtype=np.float64, na_value=np.nan)[validas]
+            con_monto = ~np.isnan(valores)
+            conteo_dia = np.bincount(codigos[con_monto], minlength=len(dias))
+            suma_dia = np.bincount(codigos, weights=np.where(con_monto, valores, 0.0), minlength=len(dias))
+            senales['dias_fragmentados'] = int(np.count_nonzero((conteo_dia > 10) & (suma_dia > 100_000_000)))
+    
+    if 'ESTADO' in columnas:
+        rechazos = _mascara_rechazo(df_cliente['ESTADO'], _RE_RECHAZO).sum()
+        senales['tasa_rechazo'] = (rechazos / total_tx) * 100 if total_tx > 0 else 0
+    
+    if 'TIPO DE TRA' in columnas:
+        senales['diversidad_tipos'] = df_cliente['TIPO DE TRA'].nunique()
+    
+    return senales
+
+
+def _alertas_volumen(senales: SenalesCliente, fecha_deteccion: str) -> List[AlertaRiesgo]:
     """Genera alertas relacionadas con volumen de transacciones"""
     alertas = []
     
-    if 'MONTO (COP)' not in df_cliente.columns:
+    if senales['monto_total'] is None:
         return alertas
     
-    monto_total = df_cliente['MONTO (COP)'].sum()
-    monto_promedio = df_cliente['MONTO (COP)'].mean()
+    monto_total = senales['monto_total']
+    monto_promedio = senales['monto_promedio']
     
     # Alerta: Volumen total muy alto
     if monto_total > 1_000_000_000:  # >$1,000M
         alertas.append({
-            'id_alerta': f"VOL-{uuid.uuid4().hex[:8].upper()}",
+            'id_alerta': _id_alerta("VOL"),
             'tipo': 'UIAF',
             'prioridad': 'Alta',
             'titulo': 'Volumen transaccional extremadamente alto',
@@ -78,7 +167,7 @@ def _alertas_volumen(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
             'valor_detectado': float(monto_total),
             'umbral': 1_000_000_000.0,
             'accion_requerida': 'Validar origen de fondos y justificación económica',
-            'fecha_deteccion': datetime.now().isoformat(),
+            'fecha_deteccion': fecha_deteccion,
             'requiere_reporte_uiaf': True,
             'dias_para_accion': 3
         })
@@ -86,7 +175,7 @@ def _alertas_volumen(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
     # Alerta: Ticket promedio muy alto
     if monto_promedio > 50_000_000:  # >$50M
         alertas.append({
-            'id_alerta': f"TKT-{uuid.uuid4().hex[:8].upper()}",
+            'id_alerta': _id_alerta("TKT"),
             'tipo': 'UIAF',
             'prioridad': 'Media',
             'titulo': 'Ticket promedio inusualmente alto',
@@ -94,7 +183,7 @@ def _alertas_volumen(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
             'valor_detectado': float(monto_promedio),
             'umbral': 50_000_000.0,
             'accion_requerida': 'Revisar perfil transaccional y naturaleza del negocio',
-            'fecha_deteccion': datetime.now().isoformat(),
+            'fecha_deteccion': fecha_deteccion,
             'requiere_reporte_uiaf': False,
             'dias_para_accion': 7
         })
@@ -102,22 +191,17 @@ def _alertas_volumen(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
     return alertas
 
 
-def _alertas_uiaf(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
+def _alertas_uiaf(senales: SenalesCliente, fecha_deteccion: str) -> List[AlertaRiesgo]:
     """Genera alertas relacionadas con señales UIAF"""
     alertas = []
     
     # Alerta: Fragmentación (smurfing)
-    if 'MONTO (COP)' in df_cliente.columns and 'FECHA' in df_cliente.columns:
-        df_temp = df_cliente.copy()
-        df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-        df_diario = df_temp.groupby(df_temp['FECHA'].dt.date)['MONTO (COP)'].agg(['count', 'sum'])
-        
-        # Detectar días con muchas TX pequeñas que suman mucho
-        dias_sospechosos = ((df_diario['count'] > 10) & (df_diario['sum'] > 100_000_000)).sum()
+    if senales['dias_fragmentados'] is not None:
+        dias_sospechosos = senales['dias_fragmentados']
         
         if dias_sospechosos > 2:
             alertas.append({
-                'id_alerta': f"FRAG-{uuid.uuid4().hex[:8].upper()}",
+                'id_alerta': _id_alerta("FRAG"),
                 'tipo': 'UIAF',
                 'prioridad': 'Crítica',
                 'titulo': 'Posible fragmentación (Smurfing)',
@@ -125,19 +209,18 @@ def _alertas_uiaf(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
                 'valor_detectado': float(dias_sospechosos),
                 'umbral': 2.0,
                 'accion_requerida': 'Investigar patrón de fragmentación y reportar a UIAF si se confirma',
-                'fecha_deteccion': datetime.now().isoformat(),
+                'fecha_deteccion': fecha_deteccion,
                 'requiere_reporte_uiaf': True,
                 'dias_para_accion': 2
             })
     
     # Alerta: Alta tasa de rechazo (posible lavado fallido)
-    if 'ESTADO' in df_cliente.columns:
-        rechazos = df_cliente['ESTADO'].str.lower().str.contains('rechaz|retor', na=False).sum()
-        tasa_rechazo = (rechazos / len(df_cliente)) * 100 if len(df_cliente) > 0 else 0
+    if senales['tasa_rechazo'] is not None:
+        tasa_rechazo = senales['tasa_rechazo']
         
         if tasa_rechazo > 25:
             alertas.append({
-                'id_alerta': f"RECH-{uuid.uuid4().hex[:8].upper()}",
+                'id_alerta': _id_alerta("RECH"),
                 'tipo': 'Fraude',
                 'prioridad': 'Alta',
                 'titulo': 'Tasa de rechazo extremadamente alta',
@@ -145,7 +228,7 @@ def _alertas_uiaf(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
                 'valor_detectado': tasa_rechazo,
                 'umbral': 25.0,
                 'accion_requerida': 'Investigar motivos de rechazo y posible intento de fraude',
-                'fecha_deteccion': datetime.now().isoformat(),
+                'fecha_deteccion': fecha_deteccion,
                 'requiere_reporte_uiaf': False,
                 'dias_para_accion': 5
             })
@@ -153,32 +236,33 @@ def _alertas_uiaf(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
     return alertas
 
 
-def _alertas_operacionales(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
+def _alertas_operacionales(senales: SenalesCliente, fecha_deteccion: str) -> List[AlertaRiesgo]:
     """Genera alertas operacionales"""
     alertas = []
+    total_tx = senales['total_tx']
     
     # Alerta: Volumen de transacciones muy alto
-    if len(df_cliente) > 1000:
+    if total_tx > 1000:
         alertas.append({
-            'id_alerta': f"FREQ-{uuid.uuid4().hex[:8].upper()}",
+            'id_alerta': _id_alerta("FREQ"),
             'tipo': 'Operacional',
             'prioridad': 'Media',
             'titulo': 'Volumen transaccional muy alto',
-            'descripcion': f'{len(df_cliente):,} transacciones requieren revisión periódica',
-            'valor_detectado': float(len(df_cliente)),
+            'descripcion': f'{total_tx:,} transacciones requieren revisión periódica',
+            'valor_detectado': float(total_tx),
             'umbral': 1000.0,
             'accion_requerida': 'Implementar revisiones manuales muestrales periódicas',
-            'fecha_deteccion': datetime.now().isoformat(),
+            'fecha_deteccion': fecha_deteccion,
             'requiere_reporte_uiaf': False,
             'dias_para_accion': 14
         })
     
     # Alerta: Alta diversidad de tipos de transacción
-    if 'TIPO DE TRA' in df_cliente.columns:
-        diversidad = df_cliente['TIPO DE TRA'].nunique()
+    if senales['diversidad_tipos'] is not None:
+        diversidad = senales['diversidad_tipos']
         if diversidad >= 6:
             alertas.append({
-                'id_alerta': f"DIV-{uuid.uuid4().hex[:8].upper()}",
+                'id_alerta': _id_alerta("DIV"),
                 'tipo': 'Compliance',
                 'prioridad': 'Baja',
                 'titulo': 'Alta diversidad de tipos de transacción',
@@ -186,7 +270,7 @@ def _alertas_operacionales(df_cliente: pd.DataFrame) -> List[AlertaRiesgo]:
                 'valor_detectado': float(diversidad),
                 'umbral': 6.0,
                 'accion_requerida': 'Validar coherencia con actividad económica del cliente',
-                'fecha_deteccion': datetime.now().isoformat(),
+                'fecha_deteccion': fecha_deteccion,
                 'requiere_reporte_uiaf': False,
                 'dias_para_accion': 30
             })
@@ -200,11 +284,9 @@ def priorizar_alertas(alertas: List[AlertaRiesgo]) -> List[AlertaRiesgo]:
     
     Orden: Crítica > Alta > Media > Baja
     """
-    orden_prioridad = {'Crítica': 1, 'Alta': 2, 'Media': 3, 'Baja': 4}
-    
     alertas_ordenadas = sorted(
         alertas,
-        key=lambda x: (orden_prioridad.get(x['prioridad'], 5), x.get('dias_para_accion', 999))
+        key=lambda x: (_ORDEN_PRIORIDAD.get(x['prioridad'], 5), x.get('dias_para_accion', 999))
     )
     
     return alertas_ordenadas
@@ -214,7 +296,8 @@ def clasificar_alerta(
     tipo: str,
     valor: float,
     umbral: float,
-    descripcion: str
+    descripcion: str,
+    fecha_deteccion: Optional[str] = None
 ) -> AlertaRiesgo:
     """
     Clasifica y crea una alerta individual
@@ -224,6 +307,7 @@ def clasificar_alerta(
         valor: Valor detectado
         umbral: Umbral de referencia
         descripcion: Descripción de la alerta
+        fecha_deteccion: Timestamp ISO de la alerta (por defecto, ahora)
     
     Returns:
         AlertaRiesgo
@@ -244,8 +328,11 @@ def clasificar_alerta(
         prioridad = 'Baja'
         dias = 30
     
+    if fecha_deteccion is None:
+        fecha_deteccion = datetime.now().isoformat()
+    
     return {
-        'id_alerta': f"CUST-{uuid.uuid4().hex[:8].upper()}",
+        'id_alerta': _id_alerta("CUST"),
         'tipo': tipo,
         'prioridad': prioridad,
         'titulo': f'Alerta {tipo}',
@@ -253,7 +340,7 @@ def clasificar_alerta(
         'valor_detectado': valor,
         'umbral': umbral,
         'accion_requerida': 'Revisar y validar',
-        'fecha_deteccion': datetime.now().isoformat(),
+        'fecha_deteccion': fecha_deteccion,
         'requiere_reporte_uiaf': prioridad in ['Crítica', 'Alta'],
         'dias_para_accion': dias
     }
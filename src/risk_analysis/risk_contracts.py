@@ -38,6 +38,16 @@ class AlertaRiesgo(TypedDict):
     dias_para_accion: int
 
 
+class SenalesCliente(TypedDict):
+    """Métricas del cliente que alimentan alertas y matriz de riesgo (None si falta la columna)"""
+    total_tx: int
+    monto_total: Optional[float]
+    monto_promedio: Optional[float]
+    dias_fragmentados: Optional[int]  # Días con >10 TX que suman >$100M
+    tasa_rechazo: Optional[float]  # % de TX rechazadas/retornadas
+    diversidad_tipos: Optional[int]
+
+
 class AnalisisRiesgo(TypedDict):
     """Resultado completo del análisis de riesgo"""
     cliente: str
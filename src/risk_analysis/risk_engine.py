@@ -4,11 +4,19 @@ Orquesta scoring, alertas y clasificación
 """
 
 import pandas as pd
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
 from typing import Optional, Dict, List
-from .risk_contracts import AnalisisRiesgo, NivelRiesgo, crear_analisis_vacio
-from .risk_scoring import calcular_score_integral
-from .risk_alerts import generar_alertas_automaticas
+from .risk_contracts import AnalisisRiesgo, NivelRiesgo, ScoreRiesgo, SenalesCliente, crear_analisis_vacio
+from .risk_scoring import calcular_score_integral, clasificar_nivel_riesgo
+from .risk_alerts import generar_alertas_automaticas, calcular_senales
+
+# Clientes mínimos para repartir la cartera entre procesos
+_MIN_CLIENTES_PARALELO = 8
+
+# Prioridades de alerta que obligan a escalar a Cumplimiento
+_PRIORIDADES_ESCALAMIENTO = frozenset({'Alta', 'Crítica'})
 
 
 def analizar_riesgo_cliente(
@@ -30,28 +38,38 @@ def analizar_riesgo_cliente(
     if df_cliente is None or df_cliente.empty:
         return crear_analisis_vacio(cliente_nombre)
     
+    # FECHA se convierte UNA vez; scoring y alertas reciben la columna ya en datetime
+    if 'FECHA' in df_cliente.columns and not pd.api.types.is_datetime64_any_dtype(df_cliente['FECHA']):
+        df_cliente = df_cliente.assign(FECHA=pd.to_datetime(df_cliente['FECHA'], errors='coerce'))
+    
+    # Timestamp único del análisis (alertas y resultado)
+    ahora = datetime.now()
+    timestamp = ahora.isoformat()
+    
     # 1. Calcular scoring integral
     scoring = calcular_score_integral(df_cliente, perfil_gafi)
     
-    # 2. Generar alertas automáticas
-    alertas = generar_alertas_automaticas(df_cliente, scoring)
+    # 2. Generar alertas automáticas (suma, media y conteos calculados una vez,
+    # compartidos con la matriz de riesgo)
+    senales = calcular_senales(df_cliente)
+    alertas = generar_alertas_automaticas(df_cliente, scoring, fecha_deteccion=timestamp, senales=senales)
     
     # 3. Construir matriz de riesgo
-    matriz = _construir_matriz_riesgo(df_cliente, scoring)
+    matriz = _construir_matriz_riesgo(senales, scoring)
     
     # 4. Generar recomendaciones
     recomendaciones = _generar_recomendaciones(scoring, alertas)
     
     # 5. Determinar acciones requeridas
     requiere_ddr = scoring['score_total'] >= 70
-    requiere_escalamiento = len([a for a in alertas if a['prioridad'] in ['Alta', 'Crítica']]) > 0
+    requiere_escalamiento = any(a['prioridad'] in _PRIORIDADES_ESCALAMIENTO for a in alertas)
     
     # 6. Calcular próximo review
-    proximo_review = _calcular_proximo_review(scoring['nivel_riesgo'])
+    proximo_review = _calcular_proximo_review(scoring['nivel_riesgo'], ahora.toordinal())
     
     return {
         'cliente': cliente_nombre,
-        'timestamp_analisis': datetime.now().isoformat(),
+        'timestamp_analisis': timestamp,
         'scoring': scoring,
         'alertas': alertas,
         'matriz_riesgo': matriz,
@@ -64,7 +82,8 @@ def analizar_riesgo_cliente(
 
 def analizar_riesgo_cartera(
     df_completo: pd.DataFrame,
-    lista_clientes: List[str]
+    lista_clientes: List[str],
+    procesos: int = 1
 ) -> Dict[str, AnalisisRiesgo]:
     """
     Analiza riesgo de múltiples clientes
@@ -72,52 +91,48 @@ def analizar_riesgo_cartera(
     Args:
         df_completo: DataFrame con todas las transacciones
         lista_clientes: Lista de nombres de clientes
+        procesos: Procesos para repartir los clientes (1 = secuencial). Con más de
+            uno, llamar desde un script protegido por `if __name__ == '__main__'`
     
     Returns:
         Dict con análisis por cliente
     """
-    analisis_cartera = {}
+    # Posiciones de cada cliente en una sola agrupación (sin escanear la tabla por cliente);
+    # solo se materializan los clientes pedidos
+    posiciones = df_completo.groupby('CLIENTE', sort=False, observed=True).indices
     
+    tareas = []
     for cliente in lista_clientes:
-        df_cliente = df_completo[df_completo['CLIENTE'] == cliente]
-        analisis_cartera[cliente] = analizar_riesgo_cliente(df_cliente, cliente_nombre=cliente)
+        filas = posiciones.get(cliente)
+        tareas.append((cliente, df_completo.take(filas) if filas is not None else None))
+    
+    # El pool solo compensa su arranque y el envío de los DataFrames en carteras grandes
+    if procesos > 1 and len(tareas) > _MIN_CLIENTES_PARALELO:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_analizar_tarea, tareas, chunksize=max(1, len(tareas) // (procesos * 4))))
+    else:
+        resultados = [_analizar_tarea(tarea) for tarea in tareas]
     
-    return analisis_cartera
+    return dict(zip(lista_clientes, resultados))
 
 
-def clasificar_nivel_riesgo(score: int) -> NivelRiesgo:
-    """
-    Clasifica nivel de riesgo según score
-    
-    Umbrales:
-    - 0-30: Bajo
-    - 31-50: Medio
-    - 51-75: Alto
-    - 76-100: Crítico
-    """
-    if score < 0 or score > 100:
-        return 'No Evaluado'
-    
-    if score <= 30:
-        return 'Bajo'
-    elif score <= 50:
-        return 'Medio'
-    elif score <= 75:
-        return 'Alto'
-    else:
-        return 'Crítico'
+def _analizar_tarea(tarea: tuple) -> AnalisisRiesgo:
+    """Analiza un (cliente, df_cliente); función de módulo para poder enviarla a otro proceso"""
+    cliente, df_cliente = tarea
+    return analizar_riesgo_cliente(df_cliente, cliente_nombre=cliente)
 
 
-def _construir_matriz_riesgo(df_cliente: pd.DataFrame, scoring: dict) -> dict:
-    """Construye matriz de riesgo inherente vs residual"""
+def _construir_matriz_riesgo(senales: SenalesCliente, scoring: ScoreRiesgo) -> dict:
+    """Construye matriz de riesgo inherente vs residual a partir de las señales del cliente"""
+    total_tx = senales['total_tx']
     
     # Riesgo inherente (sin controles)
-    monto_total = df_cliente['MONTO (COP)'].sum() if 'MONTO (COP)' in df_cliente.columns else 0
+    monto_total = senales['monto_total'] if senales['monto_total'] is not None else 0
     volumen_score = min(100, int(monto_total / 1_000_000)) if monto_total > 0 else 0
     
     riesgo_inherente = {
         'volumen': volumen_score,
-        'frecuencia': min(100, len(df_cliente) * 2),
+        'frecuencia': min(100, total_tx * 2),
         'complejidad': scoring.get('score_operativo', 0),
         'geografia': 50  # Placeholder - depende de si opera internacionalmente
     }
@@ -138,7 +153,7 @@ def _construir_matriz_riesgo(df_cliente: pd.DataFrame, scoring: dict) -> dict:
     gaps = []
     if scoring['score_total'] > 70:
         gaps.append('Due Diligence Reforzada requerida')
-    if len(df_cliente) > 1000:
+    if total_tx > 1000:
         gaps.append('Volumen alto requiere revisión manual periódica')
     
     return {
@@ -176,17 +191,21 @@ def _generar_recomendaciones(scoring: dict, alertas: list) -> List[str]:
         recomendaciones.append('📅 Revisión anual suficiente')
     
     # Recomendaciones por alertas
-    alertas_criticas = [a for a in alertas if a['prioridad'] == 'Crítica']
+    alertas_criticas = sum(1 for a in alertas if a['prioridad'] == 'Crítica')
     if alertas_criticas:
-        recomendaciones.append(f'🔴 {len(alertas_criticas)} alertas críticas requieren atención inmediata')
+        recomendaciones.append(f'🔴 {alertas_criticas} alertas críticas requieren atención inmediata')
     
     return recomendaciones
 
 
-def _calcular_proximo_review(nivel: NivelRiesgo) -> str:
-    """Calcula fecha de próximo review según nivel de riesgo"""
-    hoy = datetime.now()
+@lru_cache(maxsize=8)
+def _calcular_proximo_review(nivel: NivelRiesgo, hoy_ordinal: int) -> str:
+    """
+    Calcula fecha de próximo review según nivel de riesgo
     
+    La fecha de hoy llega como ordinal (date.toordinal) para que el resultado
+    se pueda cachear por (nivel, día) sin quedar desactualizado
+    """
     if nivel == 'Crítico':
         dias = 7  # Semanal
     elif nivel == 'Alto':
@@ -196,5 +215,4 @@ def _calcular_proximo_review(nivel: NivelRiesgo) -> str:
     else:  # Bajo
         dias = 90  # Trimestral
     
-    proximo = hoy + timedelta(days=dias)
-    return proximo.strftime('%Y-%m-%d')
+    return date.fromordinal(hoy_ordinal + dias).isoformat()
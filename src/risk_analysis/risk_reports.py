@@ -3,11 +3,21 @@ Generación de reportes de riesgo
 Crea reportes ejecutivos y matrices de riesgo
 """
 
+import heapq
+import numpy as np
 import pandas as pd
+from collections import Counter
 from datetime import datetime
 from typing import Dict, List
 from .risk_contracts import AnalisisRiesgo, ResumenEjecutivo, MatrizRiesgo
 
+# Niveles que el resumen ejecutivo siempre reporta, en este orden
+_NIVELES_RESUMEN = ('Crítico', 'Alto', 'Medio', 'Bajo', 'No Evaluado')
+
+# Formato de cada fila del top 10 en el reporte ejecutivo
+_EMOJI_NIVEL = {'Crítico': '🔴', 'Alto': '🟠', 'Medio': '🟡', 'Bajo': '🟢'}
+_LINEA_TOP_RIESGO = "{i:2d}. {emoji} {cliente:30s} | Score: {score:3d} | Alertas: {alertas}\n"
+
 
 def generar_reporte_riesgo(analisis: AnalisisRiesgo) -> str:
     """
@@ -22,7 +32,7 @@ def generar_reporte_riesgo(analisis: AnalisisRiesgo) -> str:
     scoring = analisis['scoring']
     alertas = analisis['alertas']
     
-    reporte = f"""
+    partes = [f"""
 ╔═══════════════════════════════════════════════════════════════════╗
 ║           REPORTE DE ANÁLISIS DE RIESGO TRANSACCIONAL            ║
 ╚═══════════════════════════════════════════════════════════════════╝
@@ -44,43 +54,43 @@ Desglose de Scores:
   • Operativo:  {scoring['score_operativo']}/100 (25%)
 
 Factores Críticos:
-"""
+"""]
     
     if scoring['factores_criticos']:
         for factor in scoring['factores_criticos']:
-            reporte += f"  ⚠️ {factor}\n"
+            partes.append(f"  ⚠️ {factor}\n")
     else:
-        reporte += "  ✅ No se detectaron factores críticos\n"
+        partes.append("  ✅ No se detectaron factores críticos\n")
     
-    reporte += f"\nALERTAS DETECTADAS\n------------------\n"
-    reporte += f"Total de Alertas: {len(alertas)}\n\n"
+    partes.append(f"\nALERTAS DETECTADAS\n------------------\n")
+    partes.append(f"Total de Alertas: {len(alertas)}\n\n")
     
     if alertas:
         for i, alerta in enumerate(alertas[:5], 1):  # Top 5 alertas
-            reporte += f"{i}. [{alerta['prioridad']}] {alerta['titulo']}\n"
-            reporte += f"   Tipo: {alerta['tipo']}\n"
-            reporte += f"   {alerta['descripcion']}\n"
-            reporte += f"   Acción: {alerta['accion_requerida']}\n"
+            partes.append(f"{i}. [{alerta['prioridad']}] {alerta['titulo']}\n")
+            partes.append(f"   Tipo: {alerta['tipo']}\n")
+            partes.append(f"   {alerta['descripcion']}\n")
+            partes.append(f"   Acción: {alerta['accion_requerida']}\n")
             if alerta['requiere_reporte_uiaf']:
-                reporte += f"   ⚠️ REQUIERE REPORTE UIAF\n"
-            reporte += f"\n"
+                partes.append(f"   ⚠️ REQUIERE REPORTE UIAF\n")
+            partes.append(f"\n")
     else:
-        reporte += "✅ No se detectaron alertas\n\n"
+        partes.append("✅ No se detectaron alertas\n\n")
     
-    reporte += f"ACCIONES REQUERIDAS\n-------------------\n"
+    partes.append(f"ACCIONES REQUERIDAS\n-------------------\n")
     if analisis['requiere_due_diligence_reforzada']:
-        reporte += "🔴 Due Diligence Reforzada (DDR) REQUERIDA\n"
+        partes.append("🔴 Due Diligence Reforzada (DDR) REQUERIDA\n")
     if analisis['requiere_escalamiento']:
-        reporte += "🔴 Escalamiento a Oficial de Cumplimiento REQUERIDO\n"
+        partes.append("🔴 Escalamiento a Oficial de Cumplimiento REQUERIDO\n")
     
-    reporte += f"\nRECOMENDACIONES\n---------------\n"
+    partes.append(f"\nRECOMENDACIONES\n---------------\n")
     for rec in analisis['recomendaciones']:
-        reporte += f"• {rec}\n"
+        partes.append(f"• {rec}\n")
     
-    reporte += f"\n{'='*70}\n"
-    reporte += f"Reporte generado automáticamente por Sistema de Análisis de Riesgo\n"
+    partes.append(f"\n{'='*70}\n")
+    partes.append(f"Reporte generado automáticamente por Sistema de Análisis de Riesgo\n")
     
-    return reporte
+    return "".join(partes)
 
 
 def exportar_matriz_riesgo(matriz: MatrizRiesgo) -> pd.DataFrame:
@@ -93,18 +103,21 @@ def exportar_matriz_riesgo(matriz: MatrizRiesgo) -> pd.DataFrame:
     Returns:
         DataFrame con matriz estructurada
     """
-    # Crear DataFrame con riesgo inherente vs residual
-    categorias = list(matriz['riesgo_inherente'].keys())
+    # Crear DataFrame con riesgo inherente vs residual a partir de arrays
+    categorias = list(matriz['riesgo_inherente'])
+    inherente = np.fromiter(matriz['riesgo_inherente'].values(), dtype=np.int64, count=len(categorias))
+    residual = np.fromiter((matriz['riesgo_residual'][cat] for cat in categorias), dtype=np.int64, count=len(categorias))
+    
+    # Reducción porcentual; 0 donde no hay riesgo inherente
+    con_riesgo = inherente > 0
+    reduccion = np.zeros(len(categorias))
+    reduccion[con_riesgo] = np.round((1 - residual[con_riesgo] / inherente[con_riesgo]) * 100, 1)
     
     df_matriz = pd.DataFrame({
         'Categoría': categorias,
-        'Riesgo Inherente': [matriz['riesgo_inherente'][cat] for cat in categorias],
-        'Riesgo Residual': [matriz['riesgo_residual'][cat] for cat in categorias],
-        'Reducción (%)': [
-            round((1 - matriz['riesgo_residual'][cat] / matriz['riesgo_inherente'][cat]) * 100, 1)
-            if matriz['riesgo_inherente'][cat] > 0 else 0
-            for cat in categorias
-        ]
+        'Riesgo Inherente': inherente,
+        'Riesgo Residual': residual,
+        'Reducción (%)': reduccion
     })
     
     return df_matriz
@@ -124,45 +137,46 @@ def crear_resumen_ejecutivo(
     """
     total_clientes = len(analisis_cartera)
     
-    # Contar clientes por nivel de riesgo
-    clientes_por_nivel = {
-        'Crítico': 0,
-        'Alto': 0,
-        'Medio': 0,
-        'Bajo': 0,
-        'No Evaluado': 0
-    }
+    # Contar clientes por nivel de riesgo (niveles estándar primero, con cero si no
+    # aparecen; cualquier otro nivel se agrega al final)
+    conteo_niveles = Counter(analisis['scoring']['nivel_riesgo'] for analisis in analisis_cartera.values())
+    clientes_por_nivel = {nivel: conteo_niveles.pop(nivel, 0) for nivel in _NIVELES_RESUMEN}
+    clientes_por_nivel.update(conteo_niveles)
     
     alertas_criticas = 0
     alertas_pendientes = 0
     reportes_uiaf = 0
     
-    for cliente, analisis in analisis_cartera.items():
-        nivel = analisis['scoring']['nivel_riesgo']
-        clientes_por_nivel[nivel] = clientes_por_nivel.get(nivel, 0) + 1
-        
-        # Contar alertas críticas
-        alertas_criticas += len([a for a in analisis['alertas'] if a['prioridad'] == 'Crítica'])
+    for analisis in analisis_cartera.values():
+        # Alertas críticas y reporte UIAF en una sola pasada por las alertas del cliente
+        requiere_uiaf = False
+        for alerta in analisis['alertas']:
+            if alerta['prioridad'] == 'Crítica':
+                alertas_criticas += 1
+            if alerta['requiere_reporte_uiaf']:
+                requiere_uiaf = True
         alertas_pendientes += len(analisis['alertas'])
         
         # Contar reportes UIAF requeridos
-        if any(a['requiere_reporte_uiaf'] for a in analisis['alertas']):
+        if requiere_uiaf:
             reportes_uiaf += 1
     
-    # Identificar top riesgos
-    top_riesgos = sorted(
-        [
-            {
-                'cliente': cliente,
-                'score': analisis['scoring']['score_total'],
-                'nivel': analisis['scoring']['nivel_riesgo'],
-                'alertas': len(analisis['alertas'])
-            }
-            for cliente, analisis in analisis_cartera.items()
-        ],
-        key=lambda x: x['score'],
-        reverse=True
-    )[:10]  # Top 10
+    # Identificar top riesgos: selección parcial de los 10 mayores (empates en orden
+    # de cartera, igual que un sorted estable) y solo esos se convierten a dict
+    top_clientes = heapq.nlargest(
+        10,
+        analisis_cartera.items(),
+        key=lambda item: item[1]['scoring']['score_total']
+    )
+    top_riesgos = [
+        {
+            'cliente': cliente,
+            'score': analisis['scoring']['score_total'],
+            'nivel': analisis['scoring']['nivel_riesgo'],
+            'alertas': len(analisis['alertas'])
+        }
+        for cliente, analisis in top_clientes
+    ]
     
     # Generar recomendaciones estratégicas
     recomendaciones_estrategicas = []
@@ -213,7 +227,7 @@ def generar_reporte_ejecutivo_texto(resumen: ResumenEjecutivo) -> str:
     Returns:
         str: Reporte ejecutivo
     """
-    reporte = f"""
+    partes = [f"""
 ╔═══════════════════════════════════════════════════════════════════╗
 ║                RESUMEN EJECUTIVO - ANÁLISIS DE CARTERA           ║
 ╚═══════════════════════════════════════════════════════════════════╝
@@ -234,17 +248,22 @@ DISTRIBUCIÓN DE RIESGO
 
 TOP 10 CLIENTES DE MAYOR RIESGO
 --------------------------------
-"""
+"""]
     
     for i, cliente_info in enumerate(resumen['top_riesgos'][:10], 1):
-        emoji = {'Crítico': '🔴', 'Alto': '🟠', 'Medio': '🟡', 'Bajo': '🟢'}.get(cliente_info['nivel'], '⚪')
-        reporte += f"{i:2d}. {emoji} {cliente_info['cliente']:30s} | Score: {cliente_info['score']:3d} | Alertas: {cliente_info['alertas']}\n"
-    
-    reporte += f"\nRECOMENDACIONES ESTRATÉGICAS\n----------------------------\n"
+        partes.append(_LINEA_TOP_RIESGO.format(
+            i=i,
+            emoji=_EMOJI_NIVEL.get(cliente_info['nivel'], '⚪'),
+            cliente=cliente_info['cliente'],
+            score=cliente_info['score'],
+            alertas=cliente_info['alertas']
+        ))
+    
+    partes.append(f"\nRECOMENDACIONES ESTRATÉGICAS\n----------------------------\n")
     for rec in resumen['recomendaciones_estrategicas']:
-        reporte += f"• {rec}\n"
+        partes.append(f"• {rec}\n")
     
-    reporte += f"\n{'='*70}\n"
-    reporte += f"Generado: {resumen['timestamp']}\n"
+    partes.append(f"\n{'='*70}\n")
+    partes.append(f"Generado: {resumen['timestamp']}\n")
     
-    return reporte
+    return "".join(partes)
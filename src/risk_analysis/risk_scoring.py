@@ -3,10 +3,38 @@ Sistema de scoring de riesgo
 Calcula scores GAFI, UIAF y operativos
 """
 
+from types import MappingProxyType
 import pandas as pd
 import numpy as np
+from functools import lru_cache
 from typing import Optional, Dict
-from .risk_contracts import ScoreRiesgo, crear_score_vacio
+from .risk_contracts import NivelRiesgo, ScoreRiesgo, crear_score_vacio
+from .risk_utils import _NS_DIA, _RE_RECHAZO, _RE_ERROR, _mascara_rechazo
+
+# Ponderación del score total; de solo lectura para que nadie la altere en tiempo de ejecución
+_PONDERACION = MappingProxyType({
+    'gafi': 0.40,
+    'uiaf': 0.35,
+    'operativo': 0.25
+})
+
+
+# Fechas válidas mínimas para que la fragmentación sume puntos (2 días x 6 TX)
+_MIN_TX_FRAGMENTACION = 2 * 6
+
+# Escalones de puntaje del cálculo por lotes: (umbrales, puntos por tramo, lado de
+# searchsorted). 'left' suma el tramo cuando el valor supera el umbral (>), 'right'
+# cuando lo alcanza (>=). Replican los if/elif de los scores individuales.
+_LADDERS = {
+    'volumen': (np.array([100_000_000, 500_000_000]), np.array([0, 15, 25]), 'left'),
+    'frecuencia': (np.array([10, 20]), np.array([0, 10, 20]), 'left'),
+    'tx_altas': (np.array([5, 10]), np.array([0, 10, 20]), 'left'),
+    'fragmentacion': (np.array([1, 3]), np.array([0, 15, 25]), 'left'),
+    'rechazo': (np.array([10, 20]), np.array([0, 10, 20]), 'left'),
+    'complejidad': (np.array([3, 5]), np.array([0, 10, 20]), 'right'),
+    'volatilidad': (np.array([1.0, 1.5]), np.array([0, 8, 15]), 'left'),
+    'error': (np.array([10, 15]), np.array([0, 15, 25]), 'left'),
+}
 
 
 def calcular_score_integral(
@@ -24,23 +52,17 @@ def calcular_score_integral(
     if df_cliente is None or df_cliente.empty:
         return crear_score_vacio()
     
-    # Calcular scores individuales
-    score_gafi = _calcular_score_gafi(df_cliente, perfil_gafi)
-    score_uiaf = calcular_score_uiaf(df_cliente)
-    score_operativo = calcular_score_operativo(df_cliente)
-    
-    # Ponderación
-    ponderacion = {
-        'gafi': 0.40,
-        'uiaf': 0.35,
-        'operativo': 0.25
-    }
+    # Calcular scores individuales sobre columnas preparadas una sola vez
+    datos = _preparar_datos(df_cliente)
+    score_gafi = _calcular_score_gafi(datos, perfil_gafi)
+    score_uiaf = _calcular_score_uiaf(datos)
+    score_operativo = _calcular_score_operativo(datos)
     
     # Score total ponderado
     score_total = int(
-        score_gafi * ponderacion['gafi'] +
-        score_uiaf * ponderacion['uiaf'] +
-        score_operativo * ponderacion['operativo']
+        score_gafi * _PONDERACION['gafi'] +
+        score_uiaf * _PONDERACION['uiaf'] +
+        score_operativo * _PONDERACION['operativo']
     )
     
     # Identificar factores críticos
@@ -52,9 +74,6 @@ def calcular_score_integral(
     if score_operativo > 70:
         factores_criticos.append('Riesgo operativo elevado')
     
-    # Importar función de clasificación
-    from .risk_engine import clasificar_nivel_riesgo
-    
     return {
         'score_total': score_total,
         'score_gafi': score_gafi,
@@ -62,11 +81,250 @@ def calcular_score_integral(
         'score_operativo': score_operativo,
         'nivel_riesgo': clasificar_nivel_riesgo(score_total),
         'factores_criticos': factores_criticos,
-        'ponderacion': ponderacion
+        # Copia en dict: el resultado se guarda en sesión y se envía entre procesos,
+        # y un MappingProxyType no se puede serializar con pickle
+        'ponderacion': dict(_PONDERACION)
     }
 
 
-def _calcular_score_gafi(df_cliente: pd.DataFrame, perfil_gafi: Optional[Dict]) -> int:
+@lru_cache(maxsize=128)
+def clasificar_nivel_riesgo(score: int) -> NivelRiesgo:
+    """
+    Clasifica nivel de riesgo según score
+    
+    Umbrales:
+    - 0-30: Bajo
+    - 31-50: Medio
+    - 51-75: Alto
+    - 76-100: Crítico
+    """
+    if score < 0 or score > 100:
+        return 'No Evaluado'
+    
+    if score <= 30:
+        return 'Bajo'
+    elif score <= 50:
+        return 'Medio'
+    elif score <= 75:
+        return 'Alto'
+    else:
+        return 'Crítico'
+
+
+def _preparar_datos(df_cliente: pd.DataFrame) -> Dict:
+    """
+    Extrae una sola vez las columnas que comparten los tres scores:
+    fechas parseadas, montos, ESTADO y número de tipos de transacción.
+    Las columnas ausentes quedan en None.
+    
+    'valores' es MONTO como arreglo float64 con NaN en los nulos. 'dias' es el
+    número de día (hora local) de las fechas válidas y 'validas' la máscara de
+    esas filas; alimentan los conteos por día y por semana.
+    """
+    columnas = df_cliente.columns
+    montos = valores = fechas = validas = dias = None
+    if 'MONTO (COP)' in columnas:
+        montos = df_cliente['MONTO (COP)']
+        valores = montos.to_numpy(dtype=np.float64, na_value=np.nan)
+    if 'FECHA' in columnas:
+        fechas = df_cliente['FECHA']
+        # El motor y la carga de datos ya entregan FECHA parseada; solo se parsea texto
+        if not pd.api.types.is_datetime64_any_dtype(fechas):
+            fechas = _parsear_fechas(fechas)
+        locales = fechas.dt.tz_localize(None) if fechas.dt.tz is not None else fechas
+        instantes = locales.to_numpy()
+        validas = ~np.isnat(instantes)
+        dias = instantes[validas].astype('datetime64[D]').astype(np.int64)
+    return {
+        'total_tx': len(df_cliente),
+        'montos': montos,
+        'valores': valores,
+        'fechas': fechas,
+        'validas': validas,
+        'dias': dias,
+        'estado': df_cliente['ESTADO'] if 'ESTADO' in columnas else None,
+        # Diversidad de tipos: la usan GAFI y operativo, se cuenta una sola vez
+        'n_tipos': df_cliente['TIPO DE TRA'].nunique() if 'TIPO DE TRA' in columnas else None,
+        'personas': df_cliente['TIPO_PERSONA'] if 'TIPO_PERSONA' in columnas else None
+    }
+
+
+def _parsear_fechas(texto: pd.Series) -> pd.Series:
+    """
+    Parsea FECHA en texto probando primero el parser ISO 8601 de pandas, que se
+    salta la inferencia de formato. Solo las filas no nulas que no eran ISO se
+    vuelven a parsear con la inferencia habitual, para no perder fechas en otros
+    formatos sin repetir el parseo de toda la columna.
+    """
+    fechas = pd.to_datetime(texto, errors='coerce', format='ISO8601')
+    falla = fechas.isna() & texto.notna()
+    if falla.any():
+        rescatadas = pd.to_datetime(texto[falla], errors='coerce')
+        if rescatadas.dtype != fechas.dtype:
+            # Zona horaria o resolución distinta: no se pueden mezclar en una columna
+            return pd.to_datetime(texto, errors='coerce')
+        fechas[falla] = rescatadas
+    return fechas
+
+
+def calcular_scores_batch(df: pd.DataFrame, by: str = 'CLIENTE') -> pd.DataFrame:
+    """
+    Calcula los scores de todos los clientes de un DataFrame en una sola pasada
+    
+    Aplica las mismas reglas que calcular_score_integral sin perfil GAFI, pero
+    prepara las columnas una vez y agrega por cliente con bincount en lugar de
+    recorrer los clientes uno a uno.
+    
+    Args:
+        df: DataFrame con transacciones de varios clientes
+        by: Columna que identifica al cliente
+    
+    Returns:
+        DataFrame indexado por cliente (en orden de aparición) con score_total,
+        score_gafi, score_uiaf, score_operativo y nivel_riesgo
+    """
+    columnas_resultado = ['score_total', 'score_gafi', 'score_uiaf', 'score_operativo', 'nivel_riesgo']
+    codigos, clientes = pd.factorize(df[by])
+    con_cliente = codigos >= 0
+    if not con_cliente.all():
+        df, codigos = df[con_cliente], codigos[con_cliente]
+    n_clientes = len(clientes)
+    if n_clientes == 0:
+        return pd.DataFrame(columns=columnas_resultado, index=pd.Index([], name=by))
+    
+    datos = _preparar_datos(df)
+    total_tx = np.bincount(codigos, minlength=n_clientes)
+    score_gafi = np.zeros(n_clientes, dtype=np.int64)
+    score_uiaf = np.zeros(n_clientes, dtype=np.int64)
+    score_operativo = np.zeros(n_clientes, dtype=np.int64)
+    
+    valores = datos['valores']
+    if valores is not None:
+        con_monto = ~np.isnan(valores)
+        montos_limpios = np.where(con_monto, valores, 0.0)
+        n_montos = np.bincount(codigos[con_monto], minlength=n_clientes)
+        monto_total = np.bincount(codigos, weights=montos_limpios, minlength=n_clientes)
+        
+        # GAFI: volumen
+        score_gafi += _escalon('volumen', monto_total)
+        
+        # UIAF: transacciones altas
+        tx_altas = np.bincount(codigos, weights=valores > 10_000_000, minlength=n_clientes)
+        score_uiaf += _escalon('tx_altas', tx_altas)
+        
+        # Operativo: volatilidad (desviación con ddof=1 sobre la media de cada cliente)
+        media = np.divide(monto_total, n_montos, out=np.zeros(n_clientes), where=n_montos > 1)
+        desvio = np.where(con_monto, valores - media[codigos], 0.0)
+        suma_cuadrados = np.bincount(codigos, weights=np.square(desvio), minlength=n_clientes)
+        evaluables = media > 0
+        cv = np.zeros(n_clientes)
+        cv[evaluables] = np.sqrt(suma_cuadrados[evaluables] / (n_montos[evaluables] - 1)) / media[evaluables]
+        score_operativo += _escalon('volatilidad', cv)
+    
+    if datos['fechas'] is not None and len(datos['dias']) > 0:
+        validas = datos['validas']
+        clientes_validos = codigos[validas]
+        con_fecha = np.bincount(clientes_validos, minlength=n_clientes) > 0
+        
+        # GAFI: frecuencia (días entre la primera y la última fecha, como Timedelta.days)
+        instantes = datos['fechas'].to_numpy(dtype='datetime64[ns]')[validas].view(np.int64)
+        primera = np.full(n_clientes, np.iinfo(np.int64).max)
+        ultima = np.full(n_clientes, np.iinfo(np.int64).min)
+        np.minimum.at(primera, clientes_validos, instantes)
+        np.maximum.at(ultima, clientes_validos, instantes)
+        dias_rango = np.where(con_fecha, (ultima - primera) // _NS_DIA, 0)
+        freq = total_tx / np.maximum(dias_rango, 1)
+        score_gafi += np.where(con_fecha, _escalon('frecuencia', freq), 0)
+        
+        # UIAF: fragmentación por (cliente, día)
+        if valores is not None:
+            clave, clientes_dia = _agrupar_por_cliente(clientes_validos, datos['dias'])
+            con_monto_validas = con_monto[validas]
+            conteo_dia = np.bincount(clave[con_monto_validas], minlength=len(clientes_dia))
+            suma_dia = np.bincount(clave, weights=montos_limpios[validas], minlength=len(clientes_dia))
+            fragmentado = (conteo_dia > 5) & (suma_dia > 50_000_000)
+            dias_fragmentados = np.bincount(clientes_dia[fragmentado], minlength=n_clientes)
+            score_uiaf += _escalon('fragmentacion', dias_fragmentados)
+        
+        # Operativo: concentración por (cliente, semana lunes-domingo), con semanas vacías
+        semanas = (datos['dias'] + 3) // 7
+        clave, clientes_semana = _agrupar_por_cliente(clientes_validos, semanas)
+        tx_semana = np.bincount(clave, minlength=len(clientes_semana))
+        pico = np.zeros(n_clientes, dtype=np.int64)
+        np.maximum.at(pico, clientes_semana, tx_semana)
+        semana_min = np.full(n_clientes, np.iinfo(np.int64).max)
+        semana_max = np.full(n_clientes, np.iinfo(np.int64).min)
+        np.minimum.at(semana_min, clientes_validos, semanas)
+        np.maximum.at(semana_max, clientes_validos, semanas)
+        n_semanas = np.where(con_fecha, semana_max - semana_min + 1, 1)
+        promedio = np.bincount(clientes_validos, minlength=n_clientes) / n_semanas
+        score_operativo += np.where(con_fecha & (pico > promedio * 3), 15, 0)
+    
+    if datos['estado'] is not None:
+        # UIAF y operativo: tasas de rechazo y de error
+        rechazos = np.bincount(codigos, weights=_mascara_rechazo(datos['estado'], _RE_RECHAZO), minlength=n_clientes)
+        tasa_rechazo = rechazos / total_tx * 100
+        score_uiaf += _escalon('rechazo', tasa_rechazo)
+        errores = np.bincount(codigos, weights=_mascara_rechazo(datos['estado'], _RE_ERROR), minlength=n_clientes)
+        tasa_error = errores / total_tx * 100
+        score_operativo += _escalon('error', tasa_error)
+    
+    if 'TIPO DE TRA' in df.columns:
+        # GAFI: diversidad; operativo: complejidad
+        n_tipos = _nunique_por_cliente(codigos, df['TIPO DE TRA'], n_clientes)
+        score_gafi += np.minimum(15, n_tipos * 4)
+        score_operativo += _escalon('complejidad', n_tipos)
+    
+    if datos['personas'] is not None:
+        beneficiarios = _nunique_por_cliente(codigos, datos['personas'], n_clientes)
+        score_operativo += np.where(beneficiarios > 50, 10, 0)
+    
+    score_gafi = np.minimum(score_gafi, 100)
+    score_uiaf = np.minimum(score_uiaf, 100)
+    score_operativo = np.minimum(score_operativo, 100)
+    score_total = (
+        score_gafi * _PONDERACION['gafi'] +
+        score_uiaf * _PONDERACION['uiaf'] +
+        score_operativo * _PONDERACION['operativo']
+    ).astype(np.int64)
+    
+    return pd.DataFrame({
+        'score_total': score_total,
+        'score_gafi': score_gafi,
+        'score_uiaf': score_uiaf,
+        'score_operativo': score_operativo,
+        'nivel_riesgo': [clasificar_nivel_riesgo(s) for s in score_total.tolist()]
+    }, index=pd.Index(clientes, name=by))
+
+
+def _escalon(nombre: str, valores: np.ndarray) -> np.ndarray:
+    """Puntos de cada valor según el escalón de _LADDERS, en una sola búsqueda"""
+    umbrales, puntos, lado = _LADDERS[nombre]
+    return puntos[np.searchsorted(umbrales, valores, side=lado)]
+
+
+def _agrupar_por_cliente(codigos: np.ndarray, valores: np.ndarray):
+    """
+    Factoriza pares (cliente, valor entero). Devuelve el código de par de cada
+    fila y el cliente de cada par.
+    """
+    base = valores - valores.min()
+    ancho = int(base.max()) + 1
+    clave, pares = pd.factorize(codigos.astype(np.int64) * ancho + base)
+    return clave, pares // ancho
+
+
+def _nunique_por_cliente(codigos: np.ndarray, columna: pd.Series, n_clientes: int) -> np.ndarray:
+    """Valores distintos no nulos de la columna por cliente (como nunique)"""
+    valores, _ = pd.factorize(columna)
+    presentes = valores >= 0
+    if not presentes.any():
+        return np.zeros(n_clientes, dtype=np.int64)
+    _, clientes_par = _agrupar_por_cliente(codigos[presentes], valores[presentes])
+    return np.bincount(clientes_par, minlength=n_clientes)
+
+
+def _calcular_score_gafi(datos: Dict, perfil_gafi: Optional[Dict]) -> int:
     """Score basado en criterios GAFI"""
     if perfil_gafi and 'score_riesgo' in perfil_gafi:
         return perfil_gafi['score_riesgo']
@@ -75,16 +333,16 @@ def _calcular_score_gafi(df_cliente: pd.DataFrame, perfil_gafi: Optional[Dict])
     score = 0
     
     # Volumen
-    monto_total = df_cliente['MONTO (COP)'].sum() if 'MONTO (COP)' in df_cliente.columns else 0
+    monto_total = datos['montos'].sum() if datos['montos'] is not None else 0
     if monto_total > 500_000_000:
         score += 25
     elif monto_total > 100_000_000:
         score += 15
     
     # Frecuencia
-    total_tx = len(df_cliente)
-    if 'FECHA' in df_cliente.columns:
-        fechas = pd.to_datetime(df_cliente['FECHA'], errors='coerce').dropna()
+    total_tx = datos['total_tx']
+    if datos['fechas'] is not None:
+        fechas = datos['fechas'].dropna()
         if len(fechas) > 0:
             dias = (fechas.max() - fechas.min()).days
             freq = total_tx / max(dias, 1)
@@ -94,9 +352,8 @@ def _calcular_score_gafi(df_cliente: pd.DataFrame, perfil_gafi: Optional[Dict])
                 score += 10
     
     # Diversidad
-    if 'TIPO DE TRA' in df_cliente.columns:
-        tipos = df_cliente['TIPO DE TRA'].nunique()
-        score += min(15, tipos * 4)
+    if datos['n_tipos'] is not None:
+        score += min(15, datos['n_tipos'] * 4)
     
     return min(score, 100)
 
@@ -106,34 +363,46 @@ def calcular_score_uiaf(df_cliente: pd.DataFrame) -> int:
     Score basado en señales de alerta UIAF
     Circular Externa 55 de 2016
     """
-    score = 0
-    
     if df_cliente.empty:
         return 0
     
+    return _calcular_score_uiaf(_preparar_datos(df_cliente))
+
+
+def _calcular_score_uiaf(datos: Dict) -> int:
+    """Score UIAF sobre datos ya preparados con _preparar_datos"""
+    score = 0
+    montos = datos['montos']
+    
     # 1. Transacciones en efectivo altas (>$10M)
-    if 'MONTO (COP)' in df_cliente.columns:
-        tx_altas = (df_cliente['MONTO (COP)'] > 10_000_000).sum()
+    if montos is not None:
+        tx_altas = np.count_nonzero(datos['valores'] > 10_000_000)
         if tx_altas > 10:
             score += 20
         elif tx_altas > 5:
             score += 10
     
     # 2. Fragmentación (múltiples TX pequeñas)
-    if 'MONTO (COP)' in df_cliente.columns and 'FECHA' in df_cliente.columns:
-        df_temp = df_cliente.copy()
-        df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-        df_diario = df_temp.groupby(df_temp['FECHA'].dt.date)['MONTO (COP)'].agg(['count', 'sum'])
-        dias_fragmentados = ((df_diario['count'] > 5) & (df_diario['sum'] > 50_000_000)).sum()
+    if montos is not None and datos['fechas'] is not None:
+        # Conteo (montos no nulos) y suma por día con bincount sobre el número de día
+        dias = datos['dias']
+        dias_fragmentados = 0
+        if len(dias) >= _MIN_TX_FRAGMENTACION:
+            dias = dias - dias.min()
+            valores = datos['valores'][datos['validas']]
+            con_monto = ~np.isnan(valores)
+            conteo_dia = np.bincount(dias[con_monto], minlength=dias.max() + 1)
+            suma_dia = np.bincount(dias, weights=np.where(con_monto, valores, 0.0))
+            dias_fragmentados = np.count_nonzero((conteo_dia > 5) & (suma_dia > 50_000_000))
         if dias_fragmentados > 3:
             score += 25
         elif dias_fragmentados > 1:
             score += 15
     
     # 3. Inconsistencias en actividad
-    if 'ESTADO' in df_cliente.columns:
-        rechazos = df_cliente['ESTADO'].str.lower().str.contains('rechaz|retor', na=False).sum()
-        tasa_rechazo = (rechazos / len(df_cliente)) * 100 if len(df_cliente) > 0 else 0
+    if datos['estado'] is not None:
+        rechazos = _mascara_rechazo(datos['estado'], _RE_RECHAZO).sum()
+        tasa_rechazo = (rechazos / datos['total_tx']) * 100
         if tasa_rechazo > 20:
             score += 20
         elif tasa_rechazo > 10:
@@ -144,50 +413,60 @@ def calcular_score_uiaf(df_cliente: pd.DataFrame) -> int:
 
 def calcular_score_operativo(df_cliente: pd.DataFrame) -> int:
     """Score de riesgo operativo (errores, inconsistencias, complejidad)"""
-    score = 0
-    
     if df_cliente.empty:
         return 0
     
+    return _calcular_score_operativo(_preparar_datos(df_cliente))
+
+
+def _calcular_score_operativo(datos: Dict) -> int:
+    """Score operativo sobre datos ya preparados con _preparar_datos"""
+    score = 0
+    
     # 1. Complejidad de operaciones
-    if 'TIPO DE TRA' in df_cliente.columns:
-        diversidad = df_cliente['TIPO DE TRA'].nunique()
+    if datos['n_tipos'] is not None:
+        diversidad = datos['n_tipos']
         if diversidad >= 5:
             score += 20
         elif diversidad >= 3:
             score += 10
     
     # 2. Volatilidad de montos
-    if 'MONTO (COP)' in df_cliente.columns:
-        montos = df_cliente['MONTO (COP)'].dropna()
-        if len(montos) > 0 and montos.mean() > 0:
-            cv = montos.std() / montos.mean()
+    if datos['valores'] is not None:
+        # Media calculada una vez y reutilizada para la desviación (ddof=1, como pandas);
+        # con un solo monto la desviación no está definida y no suma puntos
+        montos = datos['valores'][~np.isnan(datos['valores'])]
+        media = montos.mean() if len(montos) > 1 else 0
+        if media > 0:
+            desviacion = np.sqrt(np.square(montos - media).sum() / (len(montos) - 1))
+            cv = desviacion / media
             if cv > 1.5:  # Alta volatilidad
                 score += 15
             elif cv > 1.0:
                 score += 8
     
     # 3. Tasa de errores/rechazos
-    if 'ESTADO' in df_cliente.columns:
-        errores = df_cliente['ESTADO'].str.lower().str.contains('rechaz|error|retor', na=False).sum()
-        tasa_error = (errores / len(df_cliente)) * 100 if len(df_cliente) > 0 else 0
+    if datos['estado'] is not None:
+        errores = _mascara_rechazo(datos['estado'], _RE_ERROR).sum()
+        tasa_error = (errores / datos['total_tx']) * 100
         if tasa_error > 15:
             score += 25
         elif tasa_error > 10:
             score += 15
     
     # 4. Concentración temporal
-    if 'FECHA' in df_cliente.columns:
-        df_temp = df_cliente.copy()
-        df_temp['FECHA'] = pd.to_datetime(df_temp['FECHA'], errors='coerce')
-        df_semanal = df_temp.groupby(pd.Grouper(key='FECHA', freq='W')).size()
-        if len(df_semanal) > 0 and df_semanal.mean() > 0:
-            if df_semanal.max() > df_semanal.mean() * 3:  # Semana con 3x promedio
-                score += 15
+    # Con una sola fecha válida la semana pico es el promedio; no puede sumar
+    if datos['fechas'] is not None and len(datos['dias']) > 1:
+        # Semanas lunes-domingo como freq='W', incluidas las semanas vacías intermedias.
+        # El día 0 (1970-01-01) fue jueves: sumando 3 cada semana arranca en lunes
+        semanas = (datos['dias'] + 3) // 7
+        tx_semana = np.bincount(semanas - semanas.min())
+        if tx_semana.max() > tx_semana.mean() * 3:  # Semana con 3x promedio
+            score += 15
     
     # 5. Uso de múltiples beneficiarios
-    if 'TIPO_PERSONA' in df_cliente.columns:
-        beneficiarios = df_cliente['TIPO_PERSONA'].nunique()
+    if datos['personas'] is not None:
+        beneficiarios = datos['personas'].nunique()
         if beneficiarios > 50:
             score += 10
     
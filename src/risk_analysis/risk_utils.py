@@ -0,0 +1,40 @@
+"""
+Utilidades compartidas del análisis de riesgo
+Criterios de ESTADO y constantes de tiempo usados por scoring y alertas
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+
+# Rechazo/retorno y errores: mismo criterio que str.lower().str.contains(...)
+_RE_RECHAZO = re.compile(r'rechaz|retor', re.IGNORECASE)
+_RE_ERROR = re.compile(r'rechaz|error|retor', re.IGNORECASE)
+
+# Nanosegundos por día (rango de días entre la primera y la última TX)
+_NS_DIA = 24 * 60 * 60 * 1_000_000_000
+
+
+def _mascara_rechazo(estados: pd.Series, patron: re.Pattern = _RE_RECHAZO) -> np.ndarray:
+    """Máscara de filas cuyo ESTADO cumple el patrón, evaluándolo una vez por ESTADO distinto"""
+    codigos, estados_unicos = pd.factorize(estados)
+    return _coincidencias_estado(tuple(estados_unicos), patron)[codigos]
+
+
+@lru_cache(maxsize=64)
+def _coincidencias_estado(estados_unicos: tuple, patron: re.Pattern) -> np.ndarray:
+    """
+    Qué valores distintos de ESTADO cumplen el patrón. Los clientes de una misma
+    carga comparten casi siempre el mismo puñado de estados, así que la regex
+    corre una vez por combinación. El arreglo se comparte entre llamadas, por eso
+    se devuelve de solo lectura.
+    """
+    # El código -1 (nulo) toma el False final; valores no texto no cumplen
+    coincide = np.array(
+        [isinstance(e, str) and patron.search(e) is not None for e in estados_unicos] + [False],
+        dtype=bool
+    )
+    coincide.setflags(write=False)
+    return coincide